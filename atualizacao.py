@@ -0,0 +1,177 @@
+"""Atualização incremental do portfólio com arquivos delta, por CNPJ.
+
+O delta traz linhas completas (as colunas obrigatórias) de empréstimos novos ou alterados:
+linhas com CNPJ já existente substituem as anteriores, na mesma posição, e as demais são
+acrescentadas ao final. Só as linhas do delta passam por processar_portfolio; o cubo
+setorial e os totais do portfólio são ajustados pelas linhas que saíram e entraram.
+
+Uso (Parquet pontuado, ex.: saída do pipeline.py):
+    python atualizacao.py pontuados/carteira.parquet delta_2026_08.csv delta_2026_09.csv
+    python atualizacao.py pontuados/carteira.parquet delta.xlsx --saida carteira_atualizada.parquet
+"""
+import argparse
+import copy
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from ingestao import (
+    ESQUEMA_COLUNAS, alinhar_categorias, compactar_tipos, gravar_parquet_pontuado, hash_arquivo, ler_excel,
+    ler_portfolio, validar_cabecalho_csv
+)
+from dataset_particionado import STATUS_APROVADOS
+from processamento import CRITERIOS_PADRAO, processar_portfolio, validar_colunas
+
+COLUNAS_TOTAIS = ['ESG_Score', 'Emissoes_CO2', 'YTM']
+
+
+@dataclass
+class ResultadoDelta:
+    df: pd.DataFrame
+    removidas: pd.DataFrame
+    adicionadas: pd.DataFrame
+    atualizadas: int
+    inseridas: int
+
+
+def ler_delta(fonte, nome):
+    # Leitura sem processamento: a pontuação é feita em aplicar_delta
+    if nome.endswith('.csv'):
+        validar_cabecalho_csv(fonte)
+        return pd.read_csv(fonte, dtype=ESQUEMA_COLUNAS)
+    if nome.endswith('.parquet'):
+        return pd.read_parquet(fonte)
+    return ler_excel(fonte)
+
+
+def aplicar_delta(base, delta, criterios=CRITERIOS_PADRAO):
+    """Substitui ou acrescenta as linhas do `delta` no portfólio `base` já pontuado, pelo CNPJ."""
+    validar_colunas(delta.columns)
+    if delta['CNPJ'].isna().any():
+        raise ValueError("O arquivo delta tem linhas sem CNPJ.")
+    delta = delta.drop_duplicates('CNPJ', keep='last').reset_index(drop=True)
+    adicionadas = compactar_tipos(processar_portfolio(delta, criterios))
+    adicionadas = adicionadas[[c for c in base.columns if c in adicionadas.columns]]
+
+    substituir = base['CNPJ'].isin(adicionadas['CNPJ']).to_numpy(dtype=bool)
+    removidas = base[substituir]
+    # Linha atualizada ocupa a posição da primeira ocorrência do CNPJ; novas vão para o fim
+    primeiras = ~removidas['CNPJ'].duplicated().to_numpy()
+    posicoes = pd.Series(np.flatnonzero(substituir)[primeiras], index=removidas['CNPJ'].to_numpy()[primeiras])
+    ordem_adicionadas = posicoes.reindex(adicionadas['CNPJ'].to_numpy()).to_numpy(dtype='float64')
+    novas = np.isnan(ordem_adicionadas)
+    ordem_adicionadas[novas] = len(base) + np.arange(novas.sum())
+    ordem = np.concatenate([np.flatnonzero(~substituir), ordem_adicionadas])
+
+    mantidas, alinhadas = alinhar_categorias([base[~substituir], adicionadas])
+    df = pd.concat([mantidas, alinhadas], ignore_index=True)
+    df = df.take(np.argsort(ordem, kind='stable')).reset_index(drop=True)
+    df.attrs = {}
+    return ResultadoDelta(
+        df=compactar_tipos(df), removidas=removidas, adicionadas=adicionadas,
+        atualizadas=int((~novas).sum()), inseridas=int(novas.sum())
+    )
+
+
+def _ajustar_contagens(contagens, saiu, entrou):
+    # Só as chaves que aparecem no delta são tocadas; contagens zeradas permanecem com 0
+    variacao = entrou.value_counts().sub(saiu.value_counts(), fill_value=0).astype('int64')
+    posicoes = contagens.index.get_indexer(variacao.index)
+    existentes = posicoes >= 0
+    valores = contagens.to_numpy().copy()
+    np.add.at(valores, posicoes[existentes], variacao.to_numpy()[existentes])
+    ajustadas = pd.Series(valores, index=contagens.index, name=contagens.name)
+    if not existentes.all():
+        ajustadas = pd.concat([ajustadas, variacao[~existentes]])
+    return ajustadas
+
+
+class TotaisPortfolio:
+    """KPIs do portfólio inteiro (sem filtros), ajustáveis por delta sem reprocessar todas as linhas."""
+
+    def __init__(self, df):
+        aprovadas = df['Status_Conformidade'].isin(STATUS_APROVADOS)
+        self._empresas = df['Empresa'].value_counts()
+        self._aprovadas = df.loc[aprovadas, 'Empresa'].value_counts()
+        self._somas = df[COLUNAS_TOTAIS].sum()
+        self._contagens = df[COLUNAS_TOTAIS].count()
+
+    @property
+    def nbytes(self):
+        return int(self._empresas.memory_usage(deep=True) + self._aprovadas.memory_usage(deep=True))
+
+    def kpis(self):
+        # Mesmas chaves de kpis_dataframe
+        return {
+            'total_empresas': int((self._empresas > 0).sum()),
+            'media_esg': self._somas['ESG_Score'] / self._contagens['ESG_Score'] if self._contagens['ESG_Score'] else float('nan'),
+            'total_emissoes': self._somas['Emissoes_CO2'],
+            'empresas_aprovadas': int((self._aprovadas > 0).sum()),
+            'media_ytm': self._somas['YTM'] / self._contagens['YTM'] if self._contagens['YTM'] else float('nan'),
+        }
+
+    def atualizado(self, removidas, adicionadas):
+        novo = copy.copy(self)
+        novo._empresas = _ajustar_contagens(self._empresas, removidas['Empresa'], adicionadas['Empresa'])
+        novo._aprovadas = _ajustar_contagens(
+            self._aprovadas,
+            removidas.loc[removidas['Status_Conformidade'].isin(STATUS_APROVADOS), 'Empresa'],
+            adicionadas.loc[adicionadas['Status_Conformidade'].isin(STATUS_APROVADOS), 'Empresa']
+        )
+        novo._somas = self._somas - removidas[COLUNAS_TOTAIS].sum() + adicionadas[COLUNAS_TOTAIS].sum()
+        novo._contagens = self._contagens - removidas[COLUNAS_TOTAIS].count() + adicionadas[COLUNAS_TOTAIS].count()
+        return novo
+
+
+def carregar_delta(fonte, nome, chave_base, df_base, cache, criterios=CRITERIOS_PADRAO):
+    """Aplica o delta ao portfólio `chave_base` em cache; retorna (chave, df, resumo ou None)."""
+    if nome.endswith('.csv'):
+        validar_cabecalho_csv(fonte)
+    chave = f"{chave_base}+delta-{hash_arquivo(fonte)}"
+    aplicado = {}
+
+    def carregar():
+        aplicado['resultado'] = aplicar_delta(df_base, ler_delta(fonte, nome), criterios)
+        return aplicado['resultado'].df
+
+    df = cache.obter(chave, carregar)
+    if 'resultado' in aplicado:
+        resultado = aplicado['resultado']
+        cache.obter_derivado(chave, 'resumo_delta', lambda: {
+            'atualizadas': resultado.atualizadas, 'inseridas': resultado.inseridas
+        })
+        # Agregados já calculados para o portfólio anterior são ajustados em vez de recalculados
+        cubo = cache.consultar_derivado(chave_base, 'cubo_setorial')
+        if cubo is not None:
+            cache.obter_derivado(chave, 'cubo_setorial', lambda: cubo.atualizado(df, resultado.removidas, resultado.adicionadas))
+        totais = cache.consultar_derivado(chave_base, 'totais')
+        if totais is not None:
+            cache.obter_derivado(chave, 'totais', lambda: totais.atualizado(resultado.removidas, resultado.adicionadas))
+    return chave, df, cache.consultar_derivado(chave, 'resumo_delta')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aplica arquivos delta (por CNPJ) a um Parquet pontuado.")
+    parser.add_argument('base', help="Parquet pontuado (ex.: saída do pipeline.py)")
+    parser.add_argument('deltas', nargs='+', help="Arquivos CSV/XLSX/Parquet com linhas novas ou alteradas, em ordem")
+    parser.add_argument('-o', '--saida', default=None, help="Parquet de saída (padrão: sobrescreve a base)")
+    args = parser.parse_args(argv)
+
+    df = ler_portfolio(args.base, args.base)
+    for caminho in args.deltas:
+        resultado = aplicar_delta(df, ler_delta(caminho, caminho))
+        df = resultado.df
+        print(f"{caminho}: {resultado.atualizadas:,} linhas atualizadas, {resultado.inseridas:,} inseridas")
+    saida = args.saida or args.base
+    temporario = f"{saida}.tmp"
+    gravar_parquet_pontuado(df, temporario)
+    os.replace(temporario, saida)
+    print(f"{len(df):,} linhas gravadas em {saida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import copy
+
+import pandas as pd
+
+# Colunas numéricas que não entram no benchmarking (valores absolutos por contrato)
+COLUNAS_EXCLUIDAS = ['Valor_emprestimo', 'Total_Bonds_Issued']
+# Recortes pré-calculados do cubo
+DIMENSOES_CUBO = [('Setor',), ('Setor', 'Credit_Rating'), ('Setor', 'Status_Conformidade')]
+# Grão dos agregados parciais: as colunas categóricas dos filtros da barra lateral
+DIMENSOES_PARCIAIS = ['Setor', 'Status_Conformidade', 'Credit_Rating']
+
+ESTATISTICAS = ['Média', 'Mediana', 'P10', 'P90', 'Quantidade']
+
+
+def colunas_numericas(df):
+    colunas = df.select_dtypes(include='number').columns
+    return [col for col in colunas if col not in COLUNAS_EXCLUIDAS]
+
+
+def _estatisticas(df, dimensoes, colunas):
+    grupos = df.groupby(list(dimensoes), observed=True)[colunas]
+    # Mediana, P10 e P90 em uma única passada de quantis
+    quantis = grupos.quantile([0.5, 0.1, 0.9])
+    return pd.concat({
+        'Média': grupos.mean(),
+        'Mediana': quantis.xs(0.5, level=-1),
+        'P10': quantis.xs(0.1, level=-1),
+        'P90': quantis.xs(0.9, level=-1),
+        'Quantidade': grupos.count(),
+    }, axis=1)
+
+
+def _nivel_categorico(original, valores):
+    # Mantém a ordem das categorias do nível original (alfabética ou a de STATUS_CONFORMIDADE)
+    valores = pd.Index(valores.astype(object))
+    categorias = list(original.categories) if isinstance(original.dtype, pd.CategoricalDtype) else []
+    novas = sorted(set(valores.dropna()) - set(categorias))
+    if categorias == sorted(categorias):
+        categorias = sorted(categorias + novas)
+    else:
+        categorias = categorias + novas
+    return pd.Categorical(valores, categories=categorias)
+
+
+class CuboSetorial:
+    """Média, mediana, P10, P90 e quantidade dos indicadores numéricos por setor.
+
+    Também cobre os recortes Setor x Credit_Rating e Setor x Status_Conformidade e guarda
+    somas e contagens por combinação dos filtros categóricos, de onde `medias_filtradas`
+    tira as médias da visão filtrada sem reagrupar o portfólio.
+    """
+
+    def __init__(self, df, colunas=None):
+        self.colunas = colunas or colunas_numericas(df)
+        self._cubo = {dimensoes: _estatisticas(df, dimensoes, self.colunas) for dimensoes in DIMENSOES_CUBO}
+        self.setores = list(self._cubo[('Setor',)].index)
+
+        self._somas, self._contagens, self._linhas = self._parciais(df)
+        self._extremos = {col: self._extremos_coluna(df[col]) for col in self.colunas}
+
+    def _parciais(self, df):
+        grupos = df.groupby(DIMENSOES_PARCIAIS, observed=True, dropna=False)
+        return grupos[self.colunas].sum(), grupos[self.colunas].count(), grupos.size()
+
+    @staticmethod
+    def _extremos_coluna(valores):
+        # Com valores ausentes, um filtro de faixa sempre exclui linhas (NaN nunca cobre tudo)
+        if valores.notna().all():
+            return valores.min(), valores.max()
+        return float('nan'), float('nan')
+
+    def atualizado(self, df, removidas, adicionadas):
+        """Novo cubo para `df` = portfólio anterior - `removidas` + `adicionadas`.
+
+        Somas e contagens parciais são ajustadas só pelas linhas alteradas; média, mediana e
+        percentis são recalculados apenas para os setores afetados.
+        """
+        novo = copy.copy(self)
+        parciais_removidas = [p.reset_index() for p in self._parciais(removidas)]
+        parciais_adicionadas = [p.reset_index() for p in self._parciais(adicionadas)]
+        atuais = [p.reset_index() for p in (self._somas, self._contagens, self._linhas)]
+        ajustados = []
+        for atual, menos, mais in zip(atuais, parciais_removidas, parciais_adicionadas):
+            # Índice como texto: os portfólios podem ter categorias diferentes nas dimensões
+            partes = [parte.astype({d: object for d in DIMENSOES_PARCIAIS}) for parte in (atual, menos, mais)]
+            partes[1] = partes[1].set_index(DIMENSOES_PARCIAIS) * -1
+            partes[0] = partes[0].set_index(DIMENSOES_PARCIAIS)
+            partes[2] = partes[2].set_index(DIMENSOES_PARCIAIS)
+            ajustados.append(pd.concat(partes).groupby(level=DIMENSOES_PARCIAIS, dropna=False).sum())
+        linhas = ajustados[2].iloc[:, 0]
+        manter = (linhas > 0).to_numpy()
+        novo._somas = ajustados[0][manter]
+        novo._contagens = ajustados[1][manter]
+        novo._linhas = linhas[manter].rename(None)
+
+        afetados = pd.concat([removidas['Setor'], adicionadas['Setor']]).dropna().unique()
+        parte = df[df['Setor'].isin(afetados)]
+        novo._cubo = {}
+        for dimensoes, tabela in self._cubo.items():
+            setores_tabela = tabela.index.get_level_values('Setor') if len(dimensoes) > 1 else tabela.index
+            mantidas = tabela[~setores_tabela.isin(afetados)]
+            recalculadas = _estatisticas(parte, dimensoes, self.colunas)
+            combinada = pd.concat([t for t in (mantidas, recalculadas) if len(t)] or [mantidas])
+            niveis = [
+                _nivel_categorico(tabela.index.get_level_values(i), combinada.index.get_level_values(i))
+                for i in range(len(dimensoes))
+            ]
+            combinada.index = pd.MultiIndex.from_arrays(niveis, names=list(dimensoes)) if len(dimensoes) > 1 else pd.CategoricalIndex(niveis[0], name=dimensoes[0])
+            novo._cubo[dimensoes] = combinada.sort_index()
+        novo.setores = list(novo._cubo[('Setor',)].index)
+
+        novo._extremos = {}
+        for col in self.colunas:
+            menor, maior = self._extremos[col]
+            saiu, entrou = removidas[col], adicionadas[col]
+            if saiu.isna().any() or (len(saiu) and (saiu.min() <= menor or saiu.max() >= maior)):
+                # A linha removida podia ser o extremo (ou o único ausente): recalcula a coluna
+                novo._extremos[col] = self._extremos_coluna(df[col])
+            elif entrou.isna().any() or pd.isna(menor):
+                novo._extremos[col] = (float('nan'), float('nan'))
+            elif len(entrou):
+                novo._extremos[col] = (min(menor, entrou.min()), max(maior, entrou.max()))
+            else:
+                novo._extremos[col] = (menor, maior)
+        return novo
+
+    @property
+    def nbytes(self):
+        frames = list(self._cubo.values()) + [self._somas, self._contagens]
+        return int(sum(f.memory_usage(deep=True).sum() for f in frames) + self._linhas.memory_usage(deep=True))
+
+    def estatisticas(self, *dimensoes):
+        return self._cubo[tuple(dimensoes)]
+
+    def resumo(self, setor, colunas):
+        # Uma linha por indicador e uma coluna por estatística
+        linha = self._cubo[('Setor',)].loc[setor]
+        return linha.unstack(level=0).loc[colunas, ESTATISTICAS]
+
+    def detalhamento(self, setor, dimensao, colunas):
+        # Médias dos indicadores do setor para cada valor de `dimensao`
+        tabela = self._cubo[('Setor', dimensao)].loc[setor]
+        detalhe = tabela['Média'][colunas].copy()
+        detalhe['Quantidade'] = tabela['Quantidade'][colunas[0]]
+        return detalhe
+
+    def _cobre_tudo(self, coluna, minimo, maximo):
+        menor, maior = self._extremos[coluna]
+        return minimo <= menor and maximo >= maior
+
+    def medias_filtradas(self, df_filtrado, categorias, faixas):
+        # Médias por setor da visão filtrada; sem filtro de faixa efetivo, vêm direto dos parciais
+        if not all(self._cobre_tudo(col, mn, mx) for col, (mn, mx) in faixas.items()):
+            medias = df_filtrado.groupby('Setor', observed=True)[self.colunas].mean()
+            medias['Quantidade'] = df_filtrado.groupby('Setor', observed=True).size()
+            return medias
+
+        selecao = pd.Series(True, index=self._linhas.index)
+        for coluna, valores in categorias.items():
+            selecao &= self._linhas.index.get_level_values(coluna).isin(list(valores))
+        somas = self._somas[selecao.to_numpy()].groupby(level='Setor', observed=True).sum()
+        contagens = self._contagens[selecao.to_numpy()].groupby(level='Setor', observed=True).sum()
+        medias = somas / contagens
+        medias['Quantidade'] = self._linhas[selecao.to_numpy()].groupby(level='Setor', observed=True).sum()
+        return medias[medias['Quantidade'] > 0]
@@ -0,0 +1,147 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Empresas listadas por busca nos seletores das análises detalhada e comparativa
+LIMITE_RESULTADOS = 50
+
+
+def normalizar(valores):
+    # Minúsculas e sem acentos, para a busca não depender de grafia
+    texto = pa.array(pd.Series(valores, dtype=object).fillna('').astype(str), type=pa.string())
+    sem_acentos = pc.replace_substring_regex(pc.utf8_normalize(texto, 'NFKD'), r'\p{Mn}', '')
+    return pc.utf8_lower(sem_acentos)
+
+
+def _digitos(valores):
+    texto = pa.array(pd.Series(valores, dtype=object).fillna('').astype(str), type=pa.string())
+    return pc.replace_substring_regex(texto, r'\D', '')
+
+
+class _Chaves:
+    # Acesso por posição a um array do pyarrow, para a busca binária do bisect
+    def __init__(self, chaves):
+        self.chaves = chaves
+
+    def __len__(self):
+        return len(self.chaves)
+
+    def __getitem__(self, posicao):
+        return self.chaves[posicao].as_py()
+
+
+class _IndicePrefixo:
+    """Chaves de texto ordenadas: busca por prefixo com busca binária, em O(log n + resultados)."""
+
+    def __init__(self, chaves, codigos):
+        ordem = pc.sort_indices(chaves)
+        self._chaves = _Chaves(chaves.take(ordem))
+        self._codigos = codigos[ordem.to_numpy()]
+
+    @property
+    def nbytes(self):
+        return self._chaves.chaves.nbytes + self._codigos.nbytes
+
+    def prefixo(self, texto):
+        inicio = bisect_left(self._chaves, texto)
+        fim = bisect_right(self._chaves, texto + '￿', lo=inicio)
+        return self._codigos[inicio:fim]
+
+
+class IndiceEmpresas:
+    """Busca de empresas por nome ou CNPJ.
+
+    Nomes exatos vão direto às linhas por hash; prefixos usam listas ordenadas do nome
+    normalizado e dos dígitos do CNPJ, e só então a busca recorre a substrings.
+    `visao()` restringe resultados e linhas às empresas da visão filtrada.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        codigos, nomes = pd.factorize(df['Empresa'])
+        self._nomes = pd.Index(nomes)
+        self._nomes.get_indexer(nomes[:1])  # constrói a tabela hash agora, não na primeira seleção
+        self._codigos = codigos
+        # Linhas de cada empresa, contíguas: _linhas[_inicio[c]:_inicio[c + 1]]
+        validos = codigos >= 0
+        self._linhas = np.flatnonzero(validos)[np.argsort(codigos[validos], kind='stable')]
+        self._inicio = np.concatenate([[0], np.cumsum(np.bincount(codigos[validos], minlength=len(nomes)))])
+        # Empresa da primeira linha de cada CNPJ (atribuição em ordem inversa: a primeira prevalece)
+        codigos_cnpj, cnpjs = pd.factorize(df['CNPJ'])
+        posicoes = np.flatnonzero(codigos_cnpj >= 0)[::-1]
+        primeiras = np.full(len(cnpjs), -1)
+        primeiras[codigos_cnpj[posicoes]] = posicoes
+        empresa_cnpj = codigos[primeiras]
+        com_empresa = empresa_cnpj >= 0
+
+        self._normalizados = normalizar(nomes)
+        self._prefixo_nome = _IndicePrefixo(self._normalizados, np.arange(len(nomes)))
+        self._prefixo_cnpj = _IndicePrefixo(_digitos(cnpjs).filter(pa.array(com_empresa)), empresa_cnpj[com_empresa])
+
+    @property
+    def nbytes(self):
+        total = self._codigos.nbytes + self._linhas.nbytes + self._inicio.nbytes + self._nomes.memory_usage(deep=True)
+        total += self._normalizados.nbytes + self._prefixo_nome.nbytes + self._prefixo_cnpj.nbytes
+        return int(total)
+
+    def visao(self, df_filtrado):
+        """Restringe a busca e as linhas às do DataFrame filtrado (subconjunto de `df`)."""
+        return VisaoEmpresas(self, self.df.index.get_indexer(df_filtrado.index))
+
+
+class VisaoEmpresas:
+    """Empresas presentes em uma visão filtrada do portfólio indexado."""
+
+    def __init__(self, indice, posicoes):
+        self.indice = indice
+        self._linhas_visiveis = np.zeros(len(indice.df), dtype=bool)
+        self._linhas_visiveis[posicoes] = True
+        self._visiveis = np.zeros(len(indice._nomes), dtype=bool)
+        codigos = indice._codigos[posicoes]
+        self._visiveis[codigos[codigos >= 0]] = True
+        self.n_empresas = int(self._visiveis.sum())
+
+    def _nomes(self, codigos):
+        return list(self.indice._nomes[codigos])
+
+    def primeiras(self, limite=LIMITE_RESULTADOS):
+        # Empresas na ordem de aparição no portfólio
+        return self._nomes(np.flatnonzero(self._visiveis)[:limite])
+
+    def buscar(self, texto, limite=LIMITE_RESULTADOS):
+        """Até `limite` empresas para o texto digitado e o total de empresas encontradas.
+
+        Nomes que começam com o texto vêm primeiro, em ordem alfabética; depois os que o
+        contêm em outra posição, na ordem do portfólio. Texto só com dígitos e pontuação
+        busca também pelo início do CNPJ.
+        """
+        texto = str(texto).strip()
+        if not texto:
+            return self.primeiras(limite), self.n_empresas
+        termo = normalizar([texto])[0].as_py()
+        digitos = _digitos([texto])[0].as_py()
+        grupos = []
+        if digitos and not any(c.isalpha() for c in texto):
+            grupos.append(self.indice._prefixo_cnpj.prefixo(digitos))
+        grupos.append(self.indice._prefixo_nome.prefixo(termo))
+        contem = pc.match_substring(self.indice._normalizados, termo).to_numpy(zero_copy_only=False)
+        grupos.append(np.flatnonzero(contem))
+
+        encontrados = pd.unique(np.concatenate(grupos).astype('int64'))
+        encontrados = encontrados[self._visiveis[encontrados]]
+        return self._nomes(encontrados[:limite]), len(encontrados)
+
+    def linhas(self, empresas):
+        """Linhas visíveis das empresas, por índice hash (sem varrer a tabela)."""
+        if isinstance(empresas, str):
+            empresas = [empresas]
+        codigos = np.unique(self.indice._nomes.get_indexer(list(empresas)))
+        codigos = codigos[codigos >= 0]
+        inicio, fim = self.indice._inicio[codigos], self.indice._inicio[codigos + 1]
+        posicoes = np.concatenate([self.indice._linhas[i:f] for i, f in zip(inicio, fim)] or [np.empty(0, dtype='int64')])
+        # Mesma ordem do portfólio, como uma filtragem por isin
+        posicoes = np.sort(posicoes[self._linhas_visiveis[posicoes]])
+        return self.indice.df.iloc[posicoes]
@@ -0,0 +1,43 @@
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """Itens por chave, descartando os usados há mais tempo quando o total passa de `max_bytes`.
+
+    O tamanho de cada item é medido uma vez, ao ser guardado, por `tamanho(item)`.
+    O item mais recente sempre fica, mesmo que sozinho passe do limite.
+    """
+
+    def __init__(self, max_bytes, tamanho):
+        self.max_bytes = max_bytes
+        self.tamanho = tamanho
+        self._itens = OrderedDict()
+        self._tamanhos = {}
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+    def consultar(self, chave):
+        if chave in self._itens:
+            self._itens.move_to_end(chave)
+            return self._itens[chave]
+        return None
+
+    def guardar(self, chave, item):
+        if chave in self._itens:
+            self.total_bytes -= self._tamanhos.pop(chave)
+        self._itens[chave] = item
+        self._itens.move_to_end(chave)
+        self._tamanhos[chave] = self.tamanho(item)
+        self.total_bytes += self._tamanhos[chave]
+        while self.total_bytes > self.max_bytes and len(self._itens) > 1:
+            antiga, _ = self._itens.popitem(last=False)
+            self.total_bytes -= self._tamanhos.pop(antiga)
+        return item
+
+    def obter(self, chave, construir):
+        if chave in self._itens:
+            self._itens.move_to_end(chave)
+            return self._itens[chave]
+        return self.guardar(chave, construir())
@@ -0,0 +1,102 @@
+import itertools
+import os
+from dataclasses import astuple, replace
+
+import numpy as np
+import pandas as pd
+
+from cache_lru import CacheLRU
+from processamento import CRITERIOS_PADRAO, STATUS_CONFORMIDADE
+
+# Limite de memória das simulações guardadas por sessão (em bytes)
+CENARIOS_MAX_BYTES = int(os.environ.get('ESG_CENARIOS_MAX_MB', 32)) * 1024 * 1024
+
+# Coluna avaliada e sentido da comparação de cada campo de CriteriosConformidade
+COLUNAS_CRITERIOS = {
+    'energia_renovavel_min': ('Energia_Renovavel_Pcnt', '>='),
+    'emissoes_co2_max': ('Emissoes_CO2', '<='),
+    'certificacoes_min': ('Certificacoes_Ambientais', '>='),
+    'empregos_criados_min': ('Empregos_Criados', '>='),
+    'empregos_vulneraveis_min': ('Empregos_Vulneraveis', '>='),
+    'investimento_social_min': ('Investimento_Social_K', '>='),
+}
+CRITERIOS_GREEN = ['energia_renovavel_min', 'emissoes_co2_max', 'certificacoes_min']
+CRITERIOS_SOCIAL = ['empregos_criados_min', 'empregos_vulneraveis_min', 'investimento_social_min']
+ROTULOS_CRITERIOS = {
+    'energia_renovavel_min': 'Energia renovável mínima (%) - Green Bond',
+    'emissoes_co2_max': 'Emissões de CO2 máximas (kg) - Green Bond',
+    'certificacoes_min': 'Certificações ambientais mínimas - Green Bond',
+    'empregos_criados_min': 'Empregos criados mínimos - Social Bond',
+    'empregos_vulneraveis_min': 'Empregos vulneráveis mínimos - Social Bond',
+    'investimento_social_min': 'Investimento social mínimo (mil R$) - Social Bond',
+}
+# Elementos (cenários x linhas) avaliados por bloco: limita a memória das máscaras
+ELEMENTOS_POR_BLOCO = 4 * 1024 * 1024
+
+
+def grade_cenarios(grade, base=CRITERIOS_PADRAO):
+    """Critérios de cada cenário: produto cartesiano dos valores de `grade` ({campo: valores}) sobre `base`."""
+    campos = list(grade)
+    return [
+        replace(base, **dict(zip(campos, valores)))
+        for valores in itertools.product(*(grade[campo] for campo in campos))
+    ]
+
+
+def simular_cenarios(df, cenarios):
+    """Quantidade e valor emprestado por status de conformidade em cada cenário.
+
+    Cada critério é comparado uma vez por limite distinto (não por cenário) e as linhas são
+    processadas em blocos; o status de todos os cenários de um bloco sai de uma única
+    contagem (np.bincount). O resultado tem uma linha por cenário e status.
+    """
+    n_cenarios = len(cenarios)
+    limites, posicoes = {}, {}
+    for campo in COLUNAS_CRITERIOS:
+        limites[campo], posicoes[campo] = np.unique(
+            np.array([getattr(c, campo) for c in cenarios], dtype='float64'), return_inverse=True
+        )
+    deslocamentos = len(STATUS_CONFORMIDADE) * np.arange(n_cenarios)[:, None]
+    total = len(STATUS_CONFORMIDADE) * n_cenarios
+    quantidades = np.zeros(total, dtype='int64')
+    valores = np.zeros(total)
+
+    linhas_por_bloco = max(1, ELEMENTOS_POR_BLOCO // max(n_cenarios, 1))
+    for inicio in range(0, len(df), linhas_por_bloco):
+        bloco = df.iloc[inicio:inicio + linhas_por_bloco]
+        atende = {}
+        for campo, (coluna, sentido) in COLUNAS_CRITERIOS.items():
+            x = bloco[coluna].to_numpy(dtype='float64', na_value=np.nan)
+            # (limites distintos x linhas), expandido para (cenários x linhas) pela posição do limite
+            if sentido == '>=':
+                mascaras = x[None, :] >= limites[campo][:, None]
+            else:
+                mascaras = x[None, :] <= limites[campo][:, None]
+            atende[campo] = mascaras[posicoes[campo]]
+        green = np.logical_and.reduce([atende[c] for c in CRITERIOS_GREEN])
+        social = np.logical_and.reduce([atende[c] for c in CRITERIOS_SOCIAL])
+        # Mesma codificação de avaliar_conformidade: 3 - 2*green - social
+        codigos = (3 - 2 * green.astype('int8') - social.astype('int8') + deslocamentos).ravel()
+        valor_bloco = bloco['Valor_emprestimo'].to_numpy(dtype='float64', na_value=0.0)
+        quantidades += np.bincount(codigos, minlength=total)
+        valores += np.bincount(codigos, weights=np.tile(valor_bloco, n_cenarios), minlength=total)
+
+    resultado = pd.DataFrame([astuple(c) for c in cenarios], columns=list(COLUNAS_CRITERIOS))
+    resultado = resultado.loc[resultado.index.repeat(len(STATUS_CONFORMIDADE))].reset_index(names='Cenario')
+    resultado['Status_Conformidade'] = pd.Categorical(
+        STATUS_CONFORMIDADE * n_cenarios, categories=STATUS_CONFORMIDADE
+    )
+    resultado['Quantidade'] = quantidades
+    resultado['Valor_emprestimo'] = valores
+    return resultado
+
+
+class CacheCenarios:
+    """Simulações já calculadas, por estado dos filtros e grade de cenários."""
+
+    def __init__(self, max_bytes=CENARIOS_MAX_BYTES):
+        self._cache = CacheLRU(max_bytes, lambda resultado: int(resultado.memory_usage(deep=True).sum()))
+
+    def obter(self, df, estado, grade, base=CRITERIOS_PADRAO):
+        chave = (estado, tuple((campo, tuple(valores)) for campo, valores in grade.items()), base)
+        return self._cache.obter(chave, lambda: simular_cenarios(df, grade_cenarios(grade, base)))
@@ -0,0 +1,154 @@
+"""Gerador de portfólios sintéticos com as mesmas colunas e faixas dos dados reais.
+
+Uso:
+    python dados_sinteticos.py 1000000 carteira_1m.csv
+    python dados_sinteticos.py 100000 carteira_100k.parquet --semente 7
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ingestao import ESQUEMA_COLUNAS
+from processamento import required_columns
+
+# Participação de cada setor no portfólio
+MIX_SETORES = {
+    'Tecnologia': 0.14, 'Energia Renovável': 0.10, 'Construção': 0.11, 'Agricultura': 0.12,
+    'Serviços Financeiros': 0.09, 'Saúde': 0.08, 'Transporte': 0.10, 'Varejo': 0.12,
+    'Educação': 0.06, 'Mineração': 0.04, 'Saneamento': 0.04,
+}
+# Participação de cada rating, com YTM médio (%) associado
+MIX_RATINGS = {
+    'AAA': (0.03, 4.0), 'AA+': (0.02, 4.2), 'AA': (0.06, 4.4), 'AA-': (0.03, 4.6),
+    'A+': (0.05, 4.8), 'A': (0.12, 5.0), 'A-': (0.05, 5.2), 'BBB+': (0.07, 5.5),
+    'BBB': (0.14, 5.8), 'BBB-': (0.07, 6.1), 'BB+': (0.05, 6.6), 'BB': (0.07, 7.0),
+    'BB-': (0.04, 7.4), 'B': (0.06, 8.2), 'CCC': (0.03, 10.5), 'NR': (0.01, 7.5),
+}
+# Fator de emissão típico por setor
+FATOR_EMISSAO_SETOR = {
+    'Tecnologia': 0.10, 'Energia Renovável': 0.03, 'Construção': 0.50, 'Agricultura': 0.35,
+    'Serviços Financeiros': 0.08, 'Saúde': 0.15, 'Transporte': 0.60, 'Varejo': 0.25,
+    'Educação': 0.07, 'Mineração': 0.80, 'Saneamento': 0.30,
+}
+RADICAIS_EMPRESA = ['Nova', 'Eco', 'Agro', 'Tech', 'Prime', 'Verde', 'Max', 'Mais', 'Sul', 'Norte']
+SUFIXOS_EMPRESA = ['Energia', 'Log', 'Saúde', 'Invest', 'Foods', 'Construtora', 'Educação', 'Varejo']
+
+TAMANHOS_PADRAO = [10000, 100000, 1000000, 10000000]
+# Linhas geradas por bloco: cada bloco tem sua própria semente, então o conteúdo depende só
+# do tamanho, da semente e deste valor, não do formato gravado
+LINHAS_POR_BLOCO = 500000
+
+
+def _inteiros(rng, media, desvio, minimo, maximo, n):
+    return np.clip(np.rint(rng.normal(media, desvio, n)), minimo, maximo).astype('int64')
+
+
+def _cnpjs(ids):
+    # Formato XX.XXX.XXX/0001-XX a partir de um número sequencial (não são CNPJs válidos)
+    return [f"{i // 1000000:02d}.{i // 1000 % 1000:03d}.{i % 1000:03d}/0001-{i % 97:02d}" for i in ids.tolist()]
+
+
+def _gerar_bloco(n_linhas, semente, inicio):
+    # `inicio` desloca os identificadores e a semente do bloco
+    rng = np.random.default_rng(semente + inicio)
+    ids = np.arange(inicio, inicio + n_linhas)
+
+    setores = rng.choice(list(MIX_SETORES), size=n_linhas, p=list(MIX_SETORES.values()))
+    ratings = list(MIX_RATINGS)
+    pesos = np.array([p for p, _ in MIX_RATINGS.values()])
+    rating_idx = rng.choice(len(ratings), size=n_linhas, p=pesos / pesos.sum())
+    ytm_base = np.array([y for _, y in MIX_RATINGS.values()])[rating_idx]
+
+    valor = np.clip(rng.lognormal(np.log(600000), 0.6, n_linhas), 50000, 50000000).round(2)
+    fator = np.clip(
+        pd.Series(setores).map(FATOR_EMISSAO_SETOR).to_numpy() * rng.lognormal(0, 0.4, n_linhas), 0.01, 1.5
+    ).round(3)
+    esg = _inteiros(rng, 78, 8, 0, 100, n_linhas)
+    criados = np.clip(rng.poisson(55, n_linhas), 0, None)
+    criados[rng.random(n_linhas) < 0.01] = 0  # empresas sem empregos criados também aparecem
+
+    df = pd.DataFrame({
+        'CNPJ': _cnpjs(ids),
+        'Empresa': [
+            f"{RADICAIS_EMPRESA[i % 10]}{SUFIXOS_EMPRESA[(i // 10) % 8]} {i}" for i in ids.tolist()
+        ],
+        'Setor': setores,
+        'Valor_emprestimo': valor,
+        'Emissoes_CO2': (valor * fator).round(2),
+        'Energia_Renovavel_Pcnt': np.clip(rng.normal(50, 20, n_linhas), 0, 100).round(1),
+        'Reducao_Residuos_Ton': np.clip(rng.normal(75, 30, n_linhas), 0, None).round(1),
+        'Economia_Agua_M3': np.clip(rng.normal(3800, 900, n_linhas), 0, None).round(0),
+        'Meta_Carbono_Neutro': rng.integers(2025, 2051, n_linhas),
+        'Certificacoes_Ambientais': np.clip(rng.poisson(3, n_linhas), 0, 8),
+        'Empregos_Criados': criados,
+        'Empregos_Vulneraveis': rng.binomial(criados, 0.3),
+        'Beneficiarios_Projetos': _inteiros(rng, 1100, 450, 0, 10000, n_linhas),
+        'Investimento_Social_K': np.clip(rng.normal(520, 150, n_linhas), 0, None).round(1),
+        'Diversidade_Genero_Pcnt': np.clip(rng.normal(46, 7, n_linhas), 0, 100).round(1),
+        'Projetos_Comunidade': np.clip(rng.poisson(5, n_linhas), 0, 20),
+        'ESG_Score': esg,
+        'E_Score': np.clip(esg + np.rint(rng.normal(0, 7, n_linhas)), 0, 100).astype('int64'),
+        'S_Score': np.clip(esg + np.rint(rng.normal(0, 6, n_linhas)), 0, 100).astype('int64'),
+        'G_Score': np.clip(esg + np.rint(rng.normal(0, 6, n_linhas)), 0, 100).astype('int64'),
+        'Transparencia_Score': _inteiros(rng, 84, 5, 0, 100, n_linhas),
+        'Politicas_ESG': rng.random(n_linhas) < 0.8,
+        'Comite_Sustentabilidade': rng.random(n_linhas) < 0.7,
+        'Reportes_GRI': rng.random(n_linhas) < 0.7,
+        'Credit_Rating': np.array(ratings)[rating_idx],
+        'YTM': np.clip(ytm_base + rng.normal(0, 0.6, n_linhas), 0.5, 20).round(2),
+        'Duration': np.clip(rng.normal(7, 2.5, n_linhas), 1, 20).round(1),
+        'Total_Bonds_Issued': np.clip(rng.lognormal(np.log(550000), 0.4, n_linhas), 50000, None).round(2),
+        'Fator_emissao': fator,
+    })
+    return df[required_columns].astype(ESQUEMA_COLUNAS)
+
+
+def gerar_blocos(n_linhas, semente=0, linhas_por_bloco=LINHAS_POR_BLOCO):
+    # Portfólio de `n_linhas` em blocos de até `linhas_por_bloco`, com índice contínuo (ao menos um bloco)
+    for inicio in range(0, max(n_linhas, 1), linhas_por_bloco):
+        bloco = _gerar_bloco(min(linhas_por_bloco, n_linhas - inicio), semente, inicio)
+        bloco.index += inicio
+        yield bloco
+
+
+def gerar_portfolio(n_linhas, semente=0, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Gera `n_linhas` empresas com as 29 colunas obrigatórias (as mesmas gravadas por gravar_portfolio)."""
+    blocos = list(gerar_blocos(n_linhas, semente, linhas_por_bloco))
+    return blocos[0] if len(blocos) == 1 else pd.concat(blocos)
+
+
+def gravar_portfolio(n_linhas, caminho, semente=0, linhas_por_bloco=LINHAS_POR_BLOCO):
+    # CSV e Parquet são gravados bloco a bloco, para gerar arquivos de 10M+ linhas com memória limitada
+    if caminho.endswith('.csv'):
+        with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+            for bloco in gerar_blocos(n_linhas, semente, linhas_por_bloco):
+                bloco.to_csv(arquivo, index=False, header=arquivo.tell() == 0)
+    elif caminho.endswith('.parquet'):
+        escritor = None
+        try:
+            for bloco in gerar_blocos(n_linhas, semente, linhas_por_bloco):
+                tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+                if escritor is None:
+                    escritor = pq.ParquetWriter(caminho, tabela.schema)
+                escritor.write_table(tabela)
+        finally:
+            if escritor is not None:
+                escritor.close()
+    elif caminho.endswith('.xlsx'):
+        gerar_portfolio(n_linhas, semente, linhas_por_bloco).to_excel(caminho, index=False)
+    else:
+        raise ValueError(f"Formato não suportado: {os.path.splitext(caminho)[1]}")
+    return caminho
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gera um portfólio sintético em CSV, Parquet ou XLSX.")
+    parser.add_argument('linhas', type=int)
+    parser.add_argument('caminho')
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+    gravar_portfolio(args.linhas, args.caminho, args.semente)
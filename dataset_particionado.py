@@ -0,0 +1,255 @@
+"""Consultas fora da memória sobre um diretório de Parquets pontuados e particionados.
+
+O diretório segue o particionamento hive (ex.: Setor=Tecnologia/arquivo.parquet), como o
+gerado por `python pipeline.py ... --particionar Setor`. Os filtros da barra lateral viram
+expressões do pyarrow: filtros sobre colunas de partição descartam diretórios inteiros e os
+demais usam as estatísticas dos row groups. KPIs e médias por setor são calculados lote a
+lote; só a fatia filtrada exibida no dashboard é convertida em DataFrame.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from benchmark_setor import COLUNAS_EXCLUIDAS
+from ingestao import METADADO_VERSAO, VERSAO_PROCESSAMENTO, compactar_tipos, hash_conteudo
+from processamento import STATUS_CONFORMIDADE, required_columns, validar_colunas
+
+# Acima deste número de linhas filtradas, apenas as primeiras são materializadas
+MAX_LINHAS_MATERIALIZADAS = int(os.environ.get('ESG_DATASET_MAX_LINHAS', 500000))
+# Linhas por lote nas consultas em streaming
+LINHAS_POR_LOTE = 128 * 1024
+# Colunas calculadas por processar_portfolio que o dataset precisa trazer prontas
+COLUNAS_PONTUADAS = ['Intensidade_carbono', 'Impacto_Social_Score', 'Status_Conformidade',
+                     'Risco_ESG_Total', 'Risco_ESG', 'Risk_Level']
+STATUS_APROVADOS = STATUS_CONFORMIDADE[:3]
+COLUNAS_KPI = ['Empresa', 'ESG_Score', 'Emissoes_CO2', 'Status_Conformidade', 'YTM']
+
+
+def _tipo_arquivo(tipo):
+    # Tipos estáveis em disco: os tipos compactos dependem dos dados de cada arquivo
+    if pa.types.is_dictionary(tipo):
+        return pa.string()
+    if pa.types.is_integer(tipo):
+        return pa.int64()
+    return tipo
+
+
+def gravar_particionado(df, diretorio, particoes, nome):
+    """Acrescenta um portfólio pontuado ao dataset em `diretorio`, particionado pelas colunas `particoes`."""
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    esquema = pa.schema([pa.field(f.name, _tipo_arquivo(f.type)) for f in tabela.schema])
+    tabela = tabela.cast(esquema).replace_schema_metadata({METADADO_VERSAO: str(VERSAO_PROCESSAMENTO).encode()})
+    ds.write_dataset(
+        tabela, diretorio, format='parquet',
+        partitioning=list(particoes), partitioning_flavor='hive',
+        basename_template=f"{nome}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+    )
+    return diretorio
+
+
+def expressao_filtros(categorias=None, faixas=None):
+    # Mesma semântica do IndiceFiltros: NaN selecionado inclui ausentes, faixas excluem ausentes
+    expressao = None
+    condicoes = []
+    for coluna, selecionados in (categorias or {}).items():
+        selecionados = list(selecionados)
+        presentes = [v for v in selecionados if not pd.isna(v)]
+        # Lista vazia não tem tipo para o isin: nenhuma linha passa
+        condicao = pc.field(coluna).isin(presentes) if presentes else pc.scalar(False)
+        if len(presentes) < len(selecionados):
+            condicao = condicao | pc.field(coluna).is_null()
+        condicoes.append(condicao)
+    for coluna, (minimo, maximo) in (faixas or {}).items():
+        condicoes.append((pc.field(coluna) >= minimo) & (pc.field(coluna) <= maximo))
+    for condicao in condicoes:
+        expressao = condicao if expressao is None else expressao & condicao
+    return expressao
+
+
+def kpis_dataframe(df):
+    # KPIs do resumo calculados sobre um DataFrame em memória
+    aprovadas = df['Status_Conformidade'].isin(STATUS_APROVADOS)
+    return {
+        'total_empresas': df['Empresa'].nunique(),
+        'media_esg': df['ESG_Score'].mean(),
+        'total_emissoes': df['Emissoes_CO2'].sum(),
+        'empresas_aprovadas': df.loc[aprovadas, 'Empresa'].nunique(),
+        'media_ytm': df['YTM'].mean(),
+    }
+
+
+class _ContagemDistintos:
+    """Contagem exata (a menos de colisões de hash de 64 bits) de valores distintos em lotes."""
+
+    def __init__(self):
+        self._unicos = np.empty(0, dtype='uint64')
+        self._pendentes = []
+        self._tamanho_pendente = 0
+
+    def adicionar(self, valores):
+        valores = valores.dropna()
+        hashes = pd.util.hash_pandas_object(valores, index=False).to_numpy()
+        self._pendentes.append(np.unique(hashes))
+        self._tamanho_pendente += len(hashes)
+        if self._tamanho_pendente > 4 * max(len(self._unicos), LINHAS_POR_LOTE):
+            self._consolidar()
+
+    def _consolidar(self):
+        self._unicos = np.unique(np.concatenate([self._unicos] + self._pendentes))
+        self._pendentes = []
+        self._tamanho_pendente = 0
+
+    def total(self):
+        self._consolidar()
+        return len(self._unicos)
+
+
+class PortfolioParticionado:
+    """Portfólio em um diretório de Parquets pontuados, consultado sem carregar tudo na memória."""
+
+    def __init__(self, diretorio, max_consultas=32):
+        self.diretorio = diretorio
+        arquivos = ds.dataset(diretorio, format='parquet', partitioning='hive')
+        if not arquivos.files:
+            raise ValueError(f"Nenhum arquivo Parquet encontrado em {diretorio}")
+        # Arquivos gravados por versões diferentes podem ter tipos inteiros diferentes
+        esquema = pa.unify_schemas(
+            [f.physical_schema for f in arquivos.get_fragments()] + [arquivos.partitioning.schema],
+            promote_options='permissive'
+        )
+        self.dataset = ds.dataset(diretorio, schema=esquema, format='parquet', partitioning='hive')
+        validar_colunas(esquema.names)
+        faltando = [c for c in COLUNAS_PONTUADAS if c not in esquema.names]
+        if faltando:
+            raise ValueError(
+                f"O dataset não está pontuado (faltam {', '.join(faltando)}). "
+                "Gere-o com pipeline.py --particionar."
+            )
+        self.particoes = list(arquivos.partitioning.schema.names)
+        self.colunas = required_columns + [c for c in esquema.names if c not in required_columns]
+        self.colunas_numericas = [
+            f.name for f in esquema
+            if (pa.types.is_integer(f.type) or pa.types.is_floating(f.type)) and f.name not in COLUNAS_EXCLUIDAS
+        ]
+        identificacao = '|'.join(
+            f"{caminho}|{os.path.getsize(caminho)}|{os.stat(caminho).st_mtime_ns}" for caminho in sorted(arquivos.files)
+        )
+        self.chave = f"dataset-v{VERSAO_PROCESSAMENTO}-{hash_conteudo(identificacao.encode())}"
+        self.n_linhas = self.dataset.count_rows()
+        self._valores = {}
+        self._extremos = {}
+        self._consultas = OrderedDict()
+        self.max_consultas = max_consultas
+        self._trava = threading.Lock()
+
+    def _em_cache(self, chave, calcular):
+        # Resultados das últimas consultas; o objeto é compartilhado entre sessões (ver main.py)
+        with self._trava:
+            if chave in self._consultas:
+                self._consultas.move_to_end(chave)
+                return self._consultas[chave]
+        resultado = calcular()
+        with self._trava:
+            self._consultas[chave] = resultado
+            while len(self._consultas) > self.max_consultas:
+                self._consultas.popitem(last=False)
+        return resultado
+
+    def _lotes(self, colunas, expressao=None):
+        return self.dataset.to_batches(columns=colunas, filter=expressao, batch_size=LINHAS_POR_LOTE)
+
+    def valores(self, coluna):
+        # Valores distintos na ordem de aparição, sem ausentes (como IndiceFiltros.valores)
+        if coluna not in self._valores:
+            vistos = {}
+            if coluna in self.particoes:
+                for fragmento in self.dataset.get_fragments():
+                    valor = ds.get_partition_keys(fragmento.partition_expression).get(coluna)
+                    if valor is not None:
+                        vistos.setdefault(valor, None)
+            else:
+                for lote in self._lotes([coluna]):
+                    for valor in pc.unique(lote.column(0)).to_pylist():
+                        if valor is not None:
+                            vistos.setdefault(valor, None)
+            self._valores[coluna] = list(vistos)
+        return self._valores[coluna]
+
+    def extremos(self, coluna):
+        if coluna not in self._extremos:
+            minimos, maximos = [], []
+            for lote in self._lotes([coluna]):
+                resultado = pc.min_max(lote.column(0))
+                if resultado['min'].is_valid:
+                    minimos.append(resultado['min'].as_py())
+                    maximos.append(resultado['max'].as_py())
+            self._extremos[coluna] = (min(minimos), max(maximos)) if minimos else (None, None)
+        return self._extremos[coluna]
+
+    def contar(self, categorias=None, faixas=None):
+        estado = (repr(categorias), repr(faixas))
+        return self._em_cache(
+            ('contar',) + estado, lambda: self.dataset.count_rows(filter=expressao_filtros(categorias, faixas))
+        )
+
+    def kpis(self, categorias=None, faixas=None):
+        """Os mesmos KPIs de kpis_dataframe, acumulados lote a lote sobre as linhas filtradas."""
+        def calcular():
+            empresas, aprovadas = _ContagemDistintos(), _ContagemDistintos()
+            soma_esg = soma_ytm = total_emissoes = 0.0
+            n_esg = n_ytm = 0
+            for lote in self._lotes(COLUNAS_KPI, expressao_filtros(categorias, faixas)):
+                parte = lote.to_pandas()
+                empresas.adicionar(parte['Empresa'])
+                aprovadas.adicionar(parte.loc[parte['Status_Conformidade'].isin(STATUS_APROVADOS), 'Empresa'])
+                soma_esg += parte['ESG_Score'].sum()
+                n_esg += parte['ESG_Score'].count()
+                soma_ytm += parte['YTM'].sum()
+                n_ytm += parte['YTM'].count()
+                total_emissoes += parte['Emissoes_CO2'].sum()
+            return {
+                'total_empresas': empresas.total(),
+                'media_esg': soma_esg / n_esg if n_esg else float('nan'),
+                'total_emissoes': total_emissoes,
+                'empresas_aprovadas': aprovadas.total(),
+                'media_ytm': soma_ytm / n_ytm if n_ytm else float('nan'),
+            }
+        return self._em_cache(('kpis', repr(categorias), repr(faixas)), calcular)
+
+    def medias_setor(self, categorias=None, faixas=None):
+        """Médias por setor das linhas filtradas, no formato de CuboSetorial.medias_filtradas."""
+        def calcular():
+            somas = contagens = linhas = None
+            for lote in self._lotes(['Setor'] + self.colunas_numericas, expressao_filtros(categorias, faixas)):
+                grupos = lote.to_pandas().groupby('Setor', observed=True)
+                parciais = (grupos[self.colunas_numericas].sum(), grupos[self.colunas_numericas].count(), grupos.size())
+                if somas is None:
+                    somas, contagens, linhas = parciais
+                else:
+                    somas = somas.add(parciais[0], fill_value=0)
+                    contagens = contagens.add(parciais[1], fill_value=0)
+                    linhas = linhas.add(parciais[2], fill_value=0)
+            if somas is None:
+                return pd.DataFrame(columns=self.colunas_numericas + ['Quantidade'])
+            medias = somas / contagens
+            medias['Quantidade'] = linhas.astype('int64')
+            medias.index = medias.index.astype(str)
+            return medias.sort_index()
+        return self._em_cache(('medias_setor', repr(categorias), repr(faixas)), calcular)
+
+    def materializar(self, categorias=None, faixas=None, max_linhas=MAX_LINHAS_MATERIALIZADAS):
+        """DataFrame compacto com as linhas filtradas (até `max_linhas`) e o total de linhas do filtro."""
+        expressao = expressao_filtros(categorias, faixas)
+        total = self.contar(categorias, faixas)
+        if total > max_linhas:
+            tabela = self.dataset.head(max_linhas, columns=self.colunas, filter=expressao)
+        else:
+            tabela = self.dataset.to_table(columns=self.colunas, filter=expressao)
+        return compactar_tipos(tabela.to_pandas()), total
@@ -0,0 +1,200 @@
+"""Benchmark de tempo e memória de cada etapa do processamento, com portfólios sintéticos.
+
+Para cada tamanho gera um portfólio (dados_sinteticos.py), grava os arquivos de entrada
+e mede separadamente: leitura (CSV, XLSX, Parquet, por ler_portfolio como no app, com
+processamento e compactação), colunas derivadas, conformidade, risco ESG, risco de crédito,
+compactação de tipos, agrupamento por setor, filtragem e exportação.
+Cada medição vira uma linha JSON no arquivo de saída (acrescentada, para comparar versões).
+
+Uso:
+    python desempenho.py --linhas 10000 100000 1000000 --saida desempenho.jsonl
+    python desempenho.py --linhas 10000000 --etapas leitura_parquet conformidade risco_credito
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmark_setor import CuboSetorial
+from dados_sinteticos import TAMANHOS_PADRAO, gerar_portfolio, gravar_portfolio
+from exportacao import EXCEL_MAX_LINHAS, gerar_csv, gerar_excel, gerar_parquet
+from filtros import IndiceFiltros
+from ingestao import VERSAO_PROCESSAMENTO, compactar_tipos, ler_portfolio
+from processamento import avaliar_conformidade, enriquecer
+from risco import calcular_risco, calcular_risco_esg_total, classificar_risco_esg
+
+# Gravar e ler XLSX é lento; acima deste tamanho as etapas de Excel são puladas
+XLSX_MAX_LINHAS = 100000
+
+ETAPAS = [
+    'leitura_csv', 'leitura_xlsx', 'leitura_parquet',
+    'enriquecimento', 'conformidade', 'risco_esg', 'risco_credito', 'compactacao_tipos',
+    'agrupamento_setor', 'indice_filtros', 'filtragem',
+    'exportacao_csv', 'exportacao_parquet', 'exportacao_xlsx',
+]
+
+
+def medir(funcao, memoria=True, preparar=None):
+    """Executa `funcao` e retorna (resultado, segundos, pico de memória alocada em bytes).
+
+    O tracemalloc deixa o código Python bem mais lento, então o tempo vem de uma execução
+    sem rastreamento e o pico de memória de uma segunda execução rastreada.
+    """
+    if preparar:
+        preparar()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    duracao = time.perf_counter() - inicio
+    if not memoria:
+        return resultado, duracao, None
+    if preparar:
+        preparar()
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return resultado, duracao, pico
+
+
+def ambiente():
+    return {
+        'versao_processamento': VERSAO_PROCESSAMENTO,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def filtro_tipico(indice):
+    # Metade dos setores, todos os status, ratings de grau de investimento e ESG >= 70
+    setores = indice.valores('Setor')
+    ratings = [r for r in indice.valores('Credit_Rating') if str(r).startswith(('A', 'BBB'))]
+    categorias = {'Setor': setores[::2], 'Credit_Rating': ratings}
+    faixas = {'ESG_Score': (70, 100), 'YTM': (0, 100)}
+    return categorias, faixas
+
+
+def executar_tamanho(n_linhas, diretorio, etapas=ETAPAS, semente=0, xlsx_max_linhas=XLSX_MAX_LINHAS,
+                     memoria=True):
+    """Mede as etapas selecionadas para um portfólio de `n_linhas`; retorna uma lista de registros."""
+    registros = []
+    selecionadas = set(etapas)
+
+    def registrar(etapa, funcao, preparar=None):
+        # Etapas não pedidas que são pré-requisito das seguintes rodam sem ser registradas
+        if etapa not in selecionadas:
+            return funcao()
+        resultado, duracao, pico = medir(funcao, memoria, preparar)
+        registros.append({
+            'etapa': etapa,
+            'linhas': n_linhas,
+            'segundos': round(duracao, 6),
+            'pico_memoria_bytes': pico,
+            'linhas_por_segundo': round(n_linhas / duracao) if duracao > 0 else None,
+        })
+        return resultado
+
+    def pulada(etapa, motivo):
+        registros.append({'etapa': etapa, 'linhas': n_linhas, 'pulada': motivo})
+
+    caminho_csv = os.path.join(diretorio, f"portfolio_{n_linhas}.csv")
+    caminho_parquet = os.path.join(diretorio, f"portfolio_{n_linhas}.parquet")
+    caminho_xlsx = os.path.join(diretorio, f"portfolio_{n_linhas}.xlsx")
+    usa_excel = n_linhas <= xlsx_max_linhas
+
+    if 'leitura_csv' in selecionadas:
+        gravar_portfolio(n_linhas, caminho_csv, semente)
+        registrar('leitura_csv', lambda: ler_portfolio(caminho_csv, caminho_csv))
+        os.remove(caminho_csv)
+    if 'leitura_xlsx' in selecionadas:
+        if usa_excel:
+            gravar_portfolio(n_linhas, caminho_xlsx, semente)
+            registrar('leitura_xlsx', lambda: ler_portfolio(caminho_xlsx, caminho_xlsx))
+            os.remove(caminho_xlsx)
+        else:
+            pulada('leitura_xlsx', f"acima de {xlsx_max_linhas} linhas")
+    if 'leitura_parquet' in selecionadas:
+        gravar_portfolio(n_linhas, caminho_parquet, semente)
+        registrar('leitura_parquet', lambda: ler_portfolio(caminho_parquet, caminho_parquet))
+        os.remove(caminho_parquet)
+
+    # As etapas seguintes rodam em sequência sobre o portfólio bruto (o mesmo gravado nos arquivos),
+    # como em processar_portfolio
+    df = gerar_portfolio(n_linhas, semente)
+    df = registrar('enriquecimento', lambda: enriquecer(df))
+    df['Status_Conformidade'] = registrar('conformidade', lambda: avaliar_conformidade(df))
+    df['Risco_ESG_Total'] = registrar('risco_esg', lambda: calcular_risco_esg_total(df))
+    df['Risco_ESG'] = classificar_risco_esg(df['Risco_ESG_Total'])
+    df['Risk_Level'] = registrar('risco_credito', lambda: calcular_risco(df))
+    # Como em ler_portfolio, as etapas seguintes usam o portfólio com tipos compactos
+    df = registrar('compactacao_tipos', lambda: compactar_tipos(df))
+
+    if 'agrupamento_setor' in selecionadas:
+        registrar('agrupamento_setor', lambda: CuboSetorial(df))
+    if {'indice_filtros', 'filtragem'} & selecionadas:
+        indice = registrar('indice_filtros', lambda: IndiceFiltros(df))
+        categorias, faixas = filtro_tipico(indice)
+        # Cache das últimas máscaras esvaziado a cada execução: mede a primeira aplicação do filtro
+        ultimas = {}
+        registrar('filtragem', lambda: indice.filtrar(df, categorias, faixas, ultimas), preparar=ultimas.clear)
+    if 'exportacao_csv' in selecionadas:
+        registrar('exportacao_csv', lambda: gerar_csv(df))
+    if 'exportacao_parquet' in selecionadas:
+        registrar('exportacao_parquet', lambda: gerar_parquet(df))
+    if 'exportacao_xlsx' in selecionadas:
+        if usa_excel and n_linhas + 1 <= EXCEL_MAX_LINHAS:
+            registrar('exportacao_xlsx', lambda: gerar_excel(df))
+        else:
+            pulada('exportacao_xlsx', f"acima de {xlsx_max_linhas} linhas")
+    return registros
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mede tempo e memória de cada etapa com portfólios sintéticos.")
+    parser.add_argument('--linhas', type=int, nargs='+', default=TAMANHOS_PADRAO[:2],
+                        help=f"Tamanhos dos portfólios (padrão: {TAMANHOS_PADRAO[0]} {TAMANHOS_PADRAO[1]}; "
+                             f"sugeridos: {' '.join(map(str, TAMANHOS_PADRAO))})")
+    parser.add_argument('--etapas', nargs='+', choices=ETAPAS, default=ETAPAS)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--xlsx-max-linhas', type=int, default=XLSX_MAX_LINHAS)
+    parser.add_argument('--sem-memoria', action='store_true', help="Mede só o tempo (uma execução por etapa)")
+    parser.add_argument('--dir-dados', default=None, help="Diretório dos arquivos gerados (padrão: temporário)")
+    parser.add_argument('-o', '--saida', default=None, help="Arquivo JSON lines (acrescentado); padrão: stdout")
+    args = parser.parse_args(argv)
+
+    execucao = {'data': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'semente': args.semente, **ambiente()}
+    saida = open(args.saida, 'a', encoding='utf-8') if args.saida else sys.stdout
+    try:
+        with tempfile.TemporaryDirectory(dir=args.dir_dados) as diretorio:
+            for n_linhas in args.linhas:
+                for registro in executar_tamanho(n_linhas, diretorio, args.etapas, args.semente,
+                                                 args.xlsx_max_linhas, not args.sem_memoria):
+                    saida.write(json.dumps({**execucao, **registro}, ensure_ascii=False) + '\n')
+                    saida.flush()
+                    if 'pulada' in registro:
+                        print(f"{n_linhas:>10,}  {registro['etapa']:<20} pulada ({registro['pulada']})", file=sys.stderr)
+                    else:
+                        pico = registro['pico_memoria_bytes']
+                        memoria = f"{pico / 1024 ** 2:>9.1f} MB" if pico is not None else ''
+                        print(f"{n_linhas:>10,}  {registro['etapa']:<20} {registro['segundos']:>9.3f} s  {memoria}",
+                              file=sys.stderr)
+    finally:
+        if args.saida:
+            saida.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
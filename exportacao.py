@@ -0,0 +1,86 @@
+import gzip
+import io
+import os
+
+import pandas as pd
+
+from cache_lru import CacheLRU
+
+# Linhas escritas por vez ao gerar CSV, para não montar o arquivo inteiro como uma única string
+CSV_CHUNK_LINHAS = 100000
+# Limite de linhas de uma planilha do Excel (incluindo o cabeçalho)
+EXCEL_MAX_LINHAS = 1048576
+# Limite de memória dos arquivos de exportação já gerados, por sessão (em bytes)
+EXPORTACAO_MAX_BYTES = int(os.environ.get('ESG_EXPORTACAO_MAX_MB', 256)) * 1024 * 1024
+
+
+def _escrever_csv(df, saida):
+    texto = io.TextIOWrapper(saida, encoding='utf-8', newline='', write_through=True)
+    for inicio in range(0, max(len(df), 1), CSV_CHUNK_LINHAS):
+        df.iloc[inicio:inicio + CSV_CHUNK_LINHAS].to_csv(texto, index=False, header=inicio == 0)
+    texto.detach()
+
+
+def gerar_csv(df):
+    saida = io.BytesIO()
+    _escrever_csv(df, saida)
+    return saida.getvalue()
+
+
+def gerar_csv_gzip(df):
+    saida = io.BytesIO()
+    with gzip.GzipFile(fileobj=saida, mode='wb', compresslevel=6) as compactado:
+        _escrever_csv(df, compactado)
+    return saida.getvalue()
+
+
+def gerar_parquet(df):
+    saida = io.BytesIO()
+    df.to_parquet(saida, index=False)
+    return saida.getvalue()
+
+
+def gerar_excel(df):
+    if len(df) + 1 > EXCEL_MAX_LINHAS:
+        raise ValueError(
+            f"O Excel suporta no máximo {EXCEL_MAX_LINHAS - 1:,} linhas de dados; "
+            f"a seleção tem {len(df):,}. Use CSV ou Parquet."
+        )
+    saida = io.BytesIO()
+    writer = pd.ExcelWriter(saida, engine='xlsxwriter', engine_kwargs={'options': {'constant_memory': True}})
+    df.to_excel(writer, index=False, sheet_name='Dados')
+    writer.close()
+    return saida.getvalue()
+
+
+# Formato -> (extensão, tipo MIME, função geradora)
+FORMATOS = {
+    'CSV': ('csv', 'text/csv', gerar_csv),
+    'CSV compactado (gzip)': ('csv.gz', 'application/gzip', gerar_csv_gzip),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet', gerar_parquet),
+    'Excel (XLSX)': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', gerar_excel),
+}
+
+
+def nome_arquivo(base, formato):
+    return f"{base}.{FORMATOS[formato][0]}"
+
+
+def tipo_mime(formato):
+    return FORMATOS[formato][1]
+
+
+class CacheExportacoes:
+    """Arquivos de exportação já gerados, por estado dos filtros e formato.
+
+    Nada é gerado até `gerar` ser chamado; `obter` é só uma consulta ao cache.
+    """
+
+    def __init__(self, max_bytes=EXPORTACAO_MAX_BYTES):
+        self._cache = CacheLRU(max_bytes, len)
+
+    def obter(self, estado, formato):
+        return self._cache.consultar((estado, formato))
+
+    def gerar(self, df, estado, formato):
+        return self._cache.obter((estado, formato), lambda: FORMATOS[formato][2](df))
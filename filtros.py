@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# Colunas filtradas por seleção de categorias e por faixa de valores na barra lateral
+COLUNAS_CATEGORICAS = ['Setor', 'Status_Conformidade', 'Credit_Rating']
+COLUNAS_FAIXA = ['ESG_Score', 'YTM']
+
+
+class IndiceFiltros:
+    """Bitmaps por categoria (np.packbits) e valores ordenados por coluna de faixa.
+
+    `filtrar` combina as máscaras de cada filtro; com um dict em `ultimas`, só o filtro
+    que mudou desde a última chamada é recalculado.
+    """
+
+    def __init__(self, df, colunas_categoricas=COLUNAS_CATEGORICAS, colunas_faixa=COLUNAS_FAIXA):
+        self.n_linhas = len(df)
+        self._todas = np.packbits(np.ones(self.n_linhas, dtype=bool))
+        self._nenhuma = np.packbits(np.zeros(self.n_linhas, dtype=bool))
+        self._valores = {}
+        self._bitmaps = {}
+        self._nulos = {}
+        self._ordem = {}
+        self._ordenados = {}
+
+        for coluna in colunas_categoricas:
+            codigos, valores = pd.factorize(df[coluna])
+            self._valores[coluna] = list(valores)
+            self._bitmaps[coluna] = {
+                valor: np.packbits(codigos == codigo) for codigo, valor in enumerate(valores)
+            }
+            if (codigos == -1).any():
+                self._nulos[coluna] = np.packbits(codigos == -1)
+
+        for coluna in colunas_faixa:
+            valores = df[coluna].to_numpy(dtype='float64')
+            ordem = np.argsort(valores, kind='stable')
+            ordenados = valores[ordem]
+            validos = len(ordenados) - np.isnan(ordenados).sum()
+            self._ordem[coluna] = ordem[:validos]
+            self._ordenados[coluna] = ordenados[:validos]
+
+    @property
+    def nbytes(self):
+        total = self._todas.nbytes * (2 + sum(len(b) for b in self._bitmaps.values()) + len(self._nulos))
+        total += sum(o.nbytes for o in self._ordem.values())
+        total += sum(o.nbytes for o in self._ordenados.values())
+        return total
+
+    def valores(self, coluna):
+        # Valores distintos na ordem de aparição, como df[coluna].unique()
+        return self._valores[coluna]
+
+    def _em_cache(self, coluna, chave, calcular, ultimas):
+        if ultimas is None:
+            return calcular()
+        ultima = ultimas.get(coluna)
+        if ultima is not None and ultima[0] == chave:
+            return ultima[1]
+        bitmap = calcular()
+        ultimas[coluna] = (chave, bitmap)
+        return bitmap
+
+    def bitmap_categorias(self, coluna, selecionados, ultimas=None):
+        selecionados = list(selecionados)
+        chave = tuple(sorted(map(str, selecionados)))
+
+        def calcular():
+            bitmaps = [self._bitmaps[coluna][v] for v in selecionados if v in self._bitmaps[coluna]]
+            if coluna in self._nulos and any(pd.isna(v) for v in selecionados):
+                bitmaps.append(self._nulos[coluna])
+            if not bitmaps:
+                return self._nenhuma
+            return np.bitwise_or.reduce(bitmaps)
+
+        return self._em_cache(coluna, chave, calcular, ultimas)
+
+    def bitmap_faixa(self, coluna, minimo, maximo, ultimas=None):
+        def calcular():
+            ordenados = self._ordenados[coluna]
+            inicio = np.searchsorted(ordenados, minimo, side='left')
+            fim = np.searchsorted(ordenados, maximo, side='right')
+            if inicio == 0 and fim == self.n_linhas:
+                return self._todas
+            mascara = np.zeros(self.n_linhas, dtype=bool)
+            mascara[self._ordem[coluna][inicio:fim]] = True
+            return np.packbits(mascara)
+
+        return self._em_cache(coluna, (minimo, maximo), calcular, ultimas)
+
+    def mascara(self, categorias=None, faixas=None, ultimas=None):
+        bitmaps = [self.bitmap_categorias(c, v, ultimas) for c, v in (categorias or {}).items()]
+        bitmaps += [self.bitmap_faixa(c, mn, mx, ultimas) for c, (mn, mx) in (faixas or {}).items()]
+        if not bitmaps:
+            return np.ones(self.n_linhas, dtype=bool)
+        combinado = np.bitwise_and.reduce(bitmaps)
+        return np.unpackbits(combinado, count=self.n_linhas).view(bool)
+
+    def filtrar(self, df, categorias=None, faixas=None, ultimas=None):
+        # Filtro que seleciona todas as linhas devolve o próprio df, sem copiar; os demais copiam
+        # as linhas por posição (take), sem a indexação booleana do pandas
+        mascara = self.mascara(categorias, faixas, ultimas)
+        if mascara.all():
+            return df
+        return df.take(np.flatnonzero(mascara))
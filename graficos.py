@@ -0,0 +1,215 @@
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from cache_lru import CacheLRU
+
+# Acima deste número de empresas o modo automático deixa de desenhar uma barra por empresa
+LIMITE_EMPRESAS_GRAFICO = int(os.environ.get('ESG_GRAFICO_LIMITE_EMPRESAS', 50))
+TOP_N_PADRAO = 20
+# Faixas usadas no modo agregado para pontuações de 0 a 100
+FAIXAS_PONTUACAO = np.arange(0, 105, 5)
+
+# Limite de memória das figuras guardadas por sessão (em bytes)
+FIGURAS_MAX_BYTES = int(os.environ.get('ESG_FIGURAS_MAX_MB', 64)) * 1024 * 1024
+
+MODOS_GRAFICO = ['Automático', 'Por empresa', 'Top N', 'Agregado', 'Dispersão (WebGL)']
+
+
+def resolver_modo(modo, n_empresas, limite=LIMITE_EMPRESAS_GRAFICO):
+    if modo != 'Automático':
+        return modo
+    return 'Por empresa' if n_empresas <= limite else 'Top N'
+
+
+def _barras_por_empresa(df, value_vars, var_name, value_name, titulo):
+    fig = px.bar(
+        df.melt(id_vars=['Empresa'], value_vars=value_vars, var_name=var_name, value_name=value_name),
+        x='Empresa',
+        y=value_name,
+        color=var_name,
+        barmode='group',
+        title=titulo,
+        height=400,
+        text=value_name  # Adiciona rótulos
+    )
+    fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
+    fig.update_layout(uniformtext_minsize=8, uniformtext_mode='hide')
+    return fig
+
+
+def _distribuicao_pontuacoes(df, value_vars, var_name, titulo):
+    # Contagens por faixa calculadas no servidor: o gráfico recebe só as faixas, não as linhas
+    partes = []
+    for coluna in value_vars:
+        contagens, limites = np.histogram(df[coluna].dropna().to_numpy(), bins=FAIXAS_PONTUACAO)
+        partes.append(pd.DataFrame({
+            'Faixa': [f"{int(a)}–{int(b)}" for a, b in zip(limites[:-1], limites[1:])],
+            var_name: coluna,
+            'Empresas': contagens
+        }))
+    fig = px.bar(
+        pd.concat(partes, ignore_index=True),
+        x='Faixa',
+        y='Empresas',
+        color=var_name,
+        barmode='group',
+        title=f"{titulo} (distribuição de {len(df):,} empresas)",
+        height=400
+    )
+    return fig
+
+
+def _dispersao_pontuacoes(df, value_vars, var_name, value_name, titulo):
+    # Um ponto por empresa em WebGL, ordenado pela primeira pontuação (empates na ordem original)
+    ordenado = df.sort_values(value_vars[0], ascending=False, kind='stable')
+    melted = ordenado.assign(Posicao=np.arange(1, len(ordenado) + 1)).melt(
+        id_vars=['Empresa', 'Posicao'], value_vars=value_vars, var_name=var_name, value_name=value_name
+    )
+    fig = px.scatter(
+        melted,
+        x='Posicao',
+        y=value_name,
+        color=var_name,
+        hover_name='Empresa',
+        title=f"{titulo} (ordenado por {value_vars[0]})",
+        height=400,
+        render_mode='webgl'
+    )
+    fig.update_traces(marker=dict(size=4))
+    fig.update_layout(xaxis_title=f"Posição por {value_vars[0]}")
+    return fig
+
+
+def grafico_pontuacoes(df, value_vars, var_name, value_name, titulo, modo, top_n=TOP_N_PADRAO):
+    modo = resolver_modo(modo, len(df))
+    if modo == 'Top N':
+        top = df.nlargest(top_n, value_vars[0])
+        return _barras_por_empresa(top, value_vars, var_name, value_name, f"{titulo} (Top {top_n} por {value_vars[0]})")
+    if modo == 'Agregado':
+        return _distribuicao_pontuacoes(df, value_vars, var_name, titulo)
+    if modo == 'Dispersão (WebGL)':
+        return _dispersao_pontuacoes(df, value_vars, var_name, value_name, titulo)
+    return _barras_por_empresa(df, value_vars, var_name, value_name, titulo)
+
+
+def grafico_ratings(df, modo, top_n=TOP_N_PADRAO):
+    titulo = 'Ratings de Crédito das Empresas'
+    modo = resolver_modo(modo, len(df))
+    if modo == 'Agregado':
+        contagem = df.groupby('Credit_Rating', observed=True).size().reset_index(name='Empresas')
+        return px.bar(
+            contagem,
+            x='Credit_Rating',
+            y='Empresas',
+            color='Credit_Rating',
+            title=f"{titulo} (quantidade de empresas por rating)",
+            height=400
+        )
+    if modo == 'Dispersão (WebGL)':
+        return px.scatter(
+            df,
+            x='ESG_Score',
+            y='Credit_Rating',
+            color='Credit_Rating',
+            hover_name='Empresa',
+            title=f"{titulo} x Pontuação ESG",
+            height=400,
+            render_mode='webgl'
+        )
+    if modo == 'Top N':
+        df = df.nlargest(top_n, 'ESG_Score')
+        titulo = f"{titulo} (Top {top_n} por ESG_Score)"
+    return px.bar(
+        df,
+        x='Empresa',
+        y='Credit_Rating',
+        color='Credit_Rating',
+        title=titulo,
+        height=400,
+        hover_data={
+            'Empresa': True,
+            'Credit_Rating': True,
+            'ESG_Score': True
+        }
+    )
+
+
+def grafico_radar(values):
+    fig_radar = go.Figure(data=go.Scatterpolar(
+        r=values,
+        theta=['Ambiental', 'Social', 'Governança', 'Transparência'],
+        fill='toself',
+        marker=dict(color='green')
+    ))
+
+    fig_radar.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 100]
+            )
+        ),
+        showlegend=False,
+        title='Análise Multi-dimensional'
+    )
+    return fig_radar
+
+
+def grafico_radar_comparativo(df_comparacao, empresas_comparacao):
+    fig_radar_comp = go.Figure()
+    for empresa in empresas_comparacao:
+        empresa_data = df_comparacao[df_comparacao['Empresa'] == empresa].iloc[0]
+        fig_radar_comp.add_trace(go.Scatterpolar(
+            r=[empresa_data['E_Score'], empresa_data['S_Score'], empresa_data['G_Score'], empresa_data['Transparencia_Score']],
+            theta=['Ambiental', 'Social', 'Governança', 'Transparência'],
+            fill='toself',
+            name=empresa
+        ))
+
+    fig_radar_comp.update_layout(
+        polar=dict(radialaxis=dict(visible=True, range=[0, 100])),
+        showlegend=True,
+        title='Comparação de Scores ESG'
+    )
+    return fig_radar_comp
+
+
+def grafico_sensibilidade(resultado, campo, rotulo, medida, titulo, valor_atual=None):
+    # Uma curva por status de conformidade ao longo dos limites simulados de `campo`
+    fig = px.line(
+        resultado,
+        x=campo,
+        y=medida,
+        color='Status_Conformidade',
+        markers=True,
+        title=titulo,
+        height=400,
+        labels={campo: rotulo}
+    )
+    if valor_atual is not None:
+        fig.add_vline(x=valor_atual, line_dash='dash', annotation_text='Limite atual')
+    return fig
+
+
+def tamanho_figura(fig):
+    # Estimativa pelos arrays e listas dos traços, sem serializar a figura
+    def medir(valor):
+        if isinstance(valor, np.ndarray):
+            return valor.nbytes
+        if isinstance(valor, dict):
+            return sum(medir(v) for v in valor.values())
+        if isinstance(valor, (list, tuple)):
+            return 8 * len(valor)
+        return 0
+    return sum(medir(traco.to_plotly_json()) for traco in fig.data)
+
+
+class CacheFiguras(CacheLRU):
+    """Figuras Plotly já construídas, por chave (dados + filtros + parâmetros do gráfico)."""
+
+    def __init__(self, max_bytes=FIGURAS_MAX_BYTES):
+        super().__init__(max_bytes, tamanho_figura)
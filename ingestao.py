@@ -0,0 +1,603 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from processamento import CRITERIOS_PADRAO, processar_portfolio, validar_colunas
+
+# Incrementar quando o processamento mudar, para invalidar os caches em disco
+VERSAO_PROCESSAMENTO = 5
+
+# Chave dos metadados Parquet que identifica arquivos já pontuados (ver pipeline.py)
+METADADO_VERSAO = b'esg_versao_processamento'
+
+# Limite padrão de memória do cache de portfólios (em bytes)
+CACHE_MAX_BYTES = int(os.environ.get('ESG_CACHE_MAX_MB', 1024)) * 1024 * 1024
+# Diretório opcional para persistir os portfólios processados em Parquet
+CACHE_DIR = os.environ.get('ESG_CACHE_DIR')
+# Limite do espaço ocupado pelos portfólios persistidos em CACHE_DIR (em bytes)
+CACHE_DISCO_MAX_BYTES = int(os.environ.get('ESG_CACHE_DISCO_MAX_MB', 4096)) * 1024 * 1024
+# Diretório opcional onde planilhas e CSVs enviados ficam convertidos para Parquet e são
+# reaproveitados entre sessões; sem ele, cada conversão usa um diretório temporário removido
+# ao final da leitura
+CONVERSAO_DIR = os.environ.get('ESG_CONVERSAO_DIR') or (os.path.join(CACHE_DIR, 'conversoes') if CACHE_DIR else None)
+# Limite do espaço ocupado pelas conversões em CONVERSAO_DIR (em bytes)
+CONVERSAO_MAX_BYTES = int(os.environ.get('ESG_CONVERSAO_MAX_MB', 2048)) * 1024 * 1024
+# Pastas de conversão sem manifesto há mais tempo que isto (em segundos) são de conversões
+# interrompidas e podem ser removidas
+CONVERSAO_ORFA_SEGUNDOS = 3600
+
+
+# Tipos declarados já na leitura: só as colunas de texto (ex.: CNPJ com zeros à esquerda).
+# As numéricas são inferidas, para aceitar células vazias e manter inteiros como inteiros
+# quando não há ausentes; compactar_tipos reduz os tipos depois.
+ESQUEMA_COLUNAS = {'CNPJ': 'str', 'Empresa': 'str', 'Setor': 'str', 'Credit_Rating': 'str'}
+
+# Quantidade de linhas lidas e processadas por vez nos arquivos CSV
+CSV_CHUNK_LINHAS = int(os.environ.get('ESG_CSV_CHUNK_LINHAS', 100000))
+
+# Representação compacta aplicada depois da leitura (ver compactar_tipos)
+COLUNAS_CATEGORICAS_PORTFOLIO = ['Setor', 'Credit_Rating', 'Status_Conformidade', 'Risco_ESG', 'Risk_Level']
+COLUNAS_IDENTIFICADORES = ['CNPJ', 'Empresa']
+COLUNAS_BOOLEANAS = ['Politicas_ESG', 'Comite_Sustentabilidade', 'Reportes_GRI']
+
+
+def hash_conteudo(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def _rebobinar(fonte):
+    if hasattr(fonte, 'seek'):
+        fonte.seek(0)
+
+
+def _gravar_atomico(destino, gravar):
+    # `gravar(caminho)` escreve em um temporário exclusivo da mesma pasta, que então substitui
+    # `destino` de uma vez: sessões (threads) e workers simultâneos nunca escrevem no mesmo arquivo
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(destino) or '.', suffix='.tmp')
+    os.close(descritor)
+    try:
+        gravar(temporario)
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def hash_arquivo(fonte, bloco=1024 * 1024):
+    # Hash do arquivo (caminho ou objeto de arquivo) lido em blocos, sem copiar tudo para a memória
+    sha = hashlib.sha256()
+    if hasattr(fonte, 'read'):
+        _rebobinar(fonte)
+        for parte in iter(lambda: fonte.read(bloco), b''):
+            sha.update(parte)
+        _rebobinar(fonte)
+    else:
+        with open(fonte, 'rb') as arquivo:
+            for parte in iter(lambda: arquivo.read(bloco), b''):
+                sha.update(parte)
+    return sha.hexdigest()
+
+
+def validar_cabecalho_csv(fonte):
+    # Lê apenas a linha de cabeçalho, para que um arquivo inválido falhe antes de ler os dados
+    _rebobinar(fonte)
+    colunas = pd.read_csv(fonte, nrows=0).columns
+    _rebobinar(fonte)
+    validar_colunas(colunas)
+
+
+def ler_csv_em_blocos(fonte, criterios=CRITERIOS_PADRAO, chunksize=CSV_CHUNK_LINHAS):
+    # Cada bloco é compactado logo após o processamento: só um bloco fica com os tipos largos
+    validar_cabecalho_csv(fonte)
+    blocos = [
+        compactar_tipos(processar_portfolio(bloco, criterios))
+        for bloco in pd.read_csv(fonte, dtype=ESQUEMA_COLUNAS, chunksize=chunksize)
+    ]
+    return concatenar_compactos(blocos)
+
+
+class PartesInvalidasError(ValueError):
+    """Arquivos ou planilhas que não puderam ser lidos ou não têm as colunas obrigatórias."""
+
+    def __init__(self, erros):
+        self.erros = dict(erros)
+        super().__init__("Partes inválidas no envio:\n" + "\n".join(f"- {parte}: {erro}" for parte, erro in self.erros.items()))
+
+    def __reduce__(self):
+        return (type(self), (self.erros,))
+
+
+def rotulo_parte(nome, folha=None):
+    return nome if folha is None else f"{nome} [{folha}]"
+
+
+def ler_excel(fonte):
+    # Todas as planilhas da pasta de trabalho, cada uma validada antes da concatenação
+    _rebobinar(fonte)
+    nome = getattr(fonte, 'name', str(fonte))
+    planilhas = pd.read_excel(fonte, sheet_name=None, dtype=ESQUEMA_COLUNAS)
+    erros = {}
+    for folha, planilha in planilhas.items():
+        try:
+            validar_colunas(planilha.columns)
+        except ValueError as e:
+            erros[rotulo_parte(nome, folha)] = e
+    if erros:
+        raise PartesInvalidasError(erros)
+    if len(planilhas) == 1:
+        return next(iter(planilhas.values()))
+    return pd.concat(planilhas.values(), ignore_index=True)
+
+
+def gravar_parquet_pontuado(df, caminho):
+    # Grava o portfólio já processado, marcando a versão do processamento nos metadados
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    metadados = dict(tabela.schema.metadata or {})
+    metadados[METADADO_VERSAO] = str(VERSAO_PROCESSAMENTO).encode()
+    pq.write_table(tabela.replace_schema_metadata(metadados), caminho)
+
+
+def ler_parquet(fonte, criterios=CRITERIOS_PADRAO):
+    # Parquet já pontuado pela versão atual é usado como está; os demais são processados
+    _rebobinar(fonte)
+    tabela = pq.read_table(fonte)
+    metadados = tabela.schema.metadata or {}
+    df = tabela.to_pandas()
+    if metadados.get(METADADO_VERSAO) == str(VERSAO_PROCESSAMENTO).encode():
+        validar_colunas(df.columns)
+        return df
+    return processar_portfolio(df, criterios)
+
+
+def ler_portfolio(fonte, nome, criterios=CRITERIOS_PADRAO):
+    # Lê, valida, enriquece e compacta um arquivo CSV, XLSX ou Parquet
+    if nome.endswith('.csv'):
+        df = ler_csv_em_blocos(fonte, criterios)
+    elif nome.endswith('.parquet'):
+        df = ler_parquet(fonte, criterios)
+    else:
+        df = processar_portfolio(ler_excel(fonte), criterios)
+    return compactar_tipos(df)
+
+
+def tamanho_df(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def compactar_tipos(df):
+    """Converte o portfólio para tipos compactos sem alterar valores.
+
+    Colunas de poucos valores viram categóricas (categorias em ordem alfabética, então a
+    ordenação não muda), identificadores viram strings Arrow, inteiros são reduzidos ao
+    menor tipo com sinal e flags sem ausentes viram bool. Floats continuam float64 para
+    que somas e médias sejam idênticas. A memória antes e depois fica em df.attrs.
+    """
+    bytes_antes = df.attrs.get('bytes_antes_compactacao', tamanho_df(df))
+    tipos = {}
+    for coluna in COLUNAS_CATEGORICAS_PORTFOLIO:
+        if coluna in df.columns and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            tipos[coluna] = 'category'
+    for coluna in COLUNAS_IDENTIFICADORES:
+        if coluna in df.columns and df[coluna].dtype != 'string[pyarrow]':
+            tipos[coluna] = 'string[pyarrow]'
+    for coluna in COLUNAS_BOOLEANAS:
+        if coluna in df.columns and df[coluna].dtype != bool and df[coluna].notna().all():
+            tipos[coluna] = bool
+    df = df.astype(tipos)
+    for coluna in df.select_dtypes(include='integer').columns:
+        df[coluna] = pd.to_numeric(df[coluna], downcast='integer')
+    df.attrs['bytes_antes_compactacao'] = bytes_antes
+    df.attrs['bytes_compactado'] = tamanho_df(df)
+    return df
+
+
+def alinhar_categorias(dfs):
+    """Mesmas categorias em cada coluna categórica dos DataFrames, para que o concat não as converta em object.
+
+    Categorias alfabéticas continuam alfabéticas; as demais (ex.: status) mantêm a ordem e
+    recebem as novas no fim.
+    """
+    dfs = [df.copy(deep=False) for df in dfs]
+    if not dfs:
+        return dfs
+    for coluna in dfs[0].columns:
+        tipos = [df[coluna].dtype for df in dfs if coluna in df.columns]
+        if not all(isinstance(tipo, pd.CategoricalDtype) for tipo in tipos):
+            continue
+        categorias = list(tipos[0].categories)
+        if all(list(tipo.categories) == categorias for tipo in tipos[1:]):
+            continue
+        alfabeticas = categorias == sorted(categorias)
+        conhecidas = set(categorias)
+        for tipo in tipos[1:]:
+            novas = [c for c in tipo.categories if c not in conhecidas]
+            categorias += novas
+            conhecidas.update(novas)
+        if alfabeticas:
+            categorias = sorted(categorias)
+        for df in dfs:
+            if coluna in df.columns:
+                df[coluna] = df[coluna].cat.set_categories(categorias)
+    return dfs
+
+
+def concatenar_compactos(blocos):
+    # Concatena blocos já compactados sem voltar aos tipos largos; a memória "antes" é a soma dos blocos
+    bytes_antes = sum(bloco.attrs.get('bytes_antes_compactacao', tamanho_df(bloco)) for bloco in blocos)
+    df = pd.concat(alinhar_categorias(blocos), ignore_index=True)
+    df.attrs = {'bytes_antes_compactacao': bytes_antes}
+    return compactar_tipos(df)
+
+
+class CachePortfolios:
+    """Cache de portfólios já lidos, validados e enriquecidos, indexado pelo hash do arquivo.
+
+    Pode ser compartilhado entre sessões (ver main.py): o acesso é protegido por uma trava,
+    cada chave é carregada uma única vez mesmo com sessões pedindo-a ao mesmo tempo, e os
+    DataFrames e derivados devolvidos são somente leitura para quem os recebe.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, diretorio=CACHE_DIR, max_bytes_disco=CACHE_DISCO_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.diretorio = diretorio
+        self.max_bytes_disco = max_bytes_disco
+        self._itens = OrderedDict()
+        self._tamanhos = {}
+        self._derivados = {}
+        self.total_bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+        self._trava = threading.RLock()
+        self._travas_chave = {}
+
+    def __contains__(self, chave):
+        return chave in self._itens
+
+    def __len__(self):
+        return len(self._itens)
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.parquet")
+
+    def _trava_chave(self, chave):
+        with self._trava:
+            return self._travas_chave.setdefault(chave, threading.Lock())
+
+    def _em_memoria(self, chave):
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave]
+        return None
+
+    def obter(self, chave, carregar):
+        # Retorna o DataFrame em cache ou chama `carregar()` apenas na primeira vez
+        df = self._em_memoria(chave)
+        if df is not None:
+            return df
+
+        # Sessões que pedem a mesma chave esperam a primeira terminar de carregar
+        try:
+            with self._trava_chave(chave):
+                df = self._em_memoria(chave)
+                if df is not None:
+                    return df
+                with self._trava:
+                    self.falhas += 1
+                if self.diretorio and os.path.exists(self._caminho(chave)):
+                    try:
+                        df = compactar_tipos(pd.read_parquet(self._caminho(chave)))
+                        os.utime(self._caminho(chave))  # marca o uso, para a remoção por antiguidade
+                    except Exception:
+                        df = None
+                if df is None:
+                    df = carregar()
+                    if self.diretorio:
+                        os.makedirs(self.diretorio, mode=0o700, exist_ok=True)
+                        _gravar_atomico(self._caminho(chave), lambda caminho: df.to_parquet(caminho, index=False))
+                        self._limitar_disco(manter=self._caminho(chave))
+                self._adicionar(chave, df)
+                return df
+        finally:
+            with self._trava:
+                self._travas_chave.pop(chave, None)
+
+    def obter_derivado(self, chave, nome, construir):
+        # Objetos derivados de um portfólio (índices, agregados) vivem e saem do cache junto com ele
+        with self._trava:
+            if nome in self._derivados.get(chave, {}):
+                self.acertos += 1
+                return self._derivados[chave][nome]
+        try:
+            with self._trava_chave((chave, nome)):
+                with self._trava:
+                    if nome in self._derivados.get(chave, {}):
+                        self.acertos += 1
+                        return self._derivados[chave][nome]
+                    self.falhas += 1
+                derivado = construir()
+                tamanho = getattr(derivado, 'nbytes', 0)
+                with self._trava:
+                    # Portfólio removido enquanto o derivado era construído: devolve sem guardar
+                    if chave in self._itens:
+                        self._derivados.setdefault(chave, {})[nome] = derivado
+                        self._tamanhos[chave] += tamanho
+                        self.total_bytes += tamanho
+                        self._itens.move_to_end(chave)
+                        self._remover_excedente()
+                return derivado
+        finally:
+            with self._trava:
+                self._travas_chave.pop((chave, nome), None)
+
+    def consultar_derivado(self, chave, nome):
+        # Derivado já construído, ou None (sem construir e sem contar acerto/falha)
+        with self._trava:
+            return self._derivados.get(chave, {}).get(nome)
+
+    def _adicionar(self, chave, df):
+        tamanho = tamanho_df(df)
+        with self._trava:
+            self._itens[chave] = df
+            self._tamanhos[chave] = tamanho
+            self.total_bytes += tamanho
+            self._remover_excedente()
+
+    def _remover_excedente(self):
+        # Remove os itens menos usados até caber no limite (o último usado sempre fica); chamado com a trava
+        while self.total_bytes > self.max_bytes and len(self._itens) > 1:
+            antiga, _ = self._itens.popitem(last=False)
+            self.total_bytes -= self._tamanhos.pop(antiga)
+            self._derivados.pop(antiga, None)
+            self.remocoes += 1
+
+    def _limitar_disco(self, manter):
+        # Remove os Parquets usados há mais tempo (pela data de modificação) até caber no limite
+        arquivos, total = [], 0
+        for entrada in os.scandir(self.diretorio):
+            if entrada.is_file() and entrada.name.endswith('.parquet'):
+                info = entrada.stat()
+                total += info.st_size
+                if entrada.path != manter:
+                    arquivos.append((info.st_mtime, entrada.path, info.st_size))
+        for _, caminho, tamanho in sorted(arquivos):
+            if total <= self.max_bytes_disco:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                continue
+            total -= tamanho
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                'itens': len(self._itens),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'remocoes': self.remocoes,
+            }
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+            self._tamanhos.clear()
+            self._derivados.clear()
+            self.total_bytes = 0
+
+
+def carregar_portfolio(fonte, nome, cache):
+    # Lê, valida e enriquece o arquivo enviado, reaproveitando o cache pelo hash do conteúdo
+    if nome.endswith('.csv'):
+        validar_cabecalho_csv(fonte)
+    chave = f"v{VERSAO_PROCESSAMENTO}-{hash_arquivo(fonte)}"
+    return chave, cache.obter(chave, lambda: ler_portfolio(fonte, nome))
+
+
+def _gravar_json(conteudo, caminho):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(conteudo, arquivo, ensure_ascii=False)
+
+
+def _converter_parte(origem, nome, folha, pasta, prefixo):
+    # Executado nos workers: lê uma planilha (ou o CSV, em blocos), valida as colunas e grava em
+    # Parquet; retorna os arquivos gravados em `pasta`, um por bloco do CSV
+    if nome.endswith('.csv'):
+        validar_cabecalho_csv(origem)
+        arquivos = []
+        for i, bloco in enumerate(pd.read_csv(origem, dtype=ESQUEMA_COLUNAS, chunksize=CSV_CHUNK_LINHAS)):
+            arquivos.append(f"{prefixo}_{i}.parquet")
+            _gravar_atomico(os.path.join(pasta, arquivos[-1]), lambda caminho: bloco.to_parquet(caminho, index=False))
+        if arquivos:
+            return arquivos
+        df = pd.read_csv(origem, dtype=ESQUEMA_COLUNAS)  # só o cabeçalho
+    else:
+        df = pd.read_excel(origem, sheet_name=folha, dtype=ESQUEMA_COLUNAS)
+        validar_colunas(df.columns)
+    _gravar_atomico(os.path.join(pasta, f"{prefixo}.parquet"), lambda caminho: df.to_parquet(caminho, index=False))
+    return [f"{prefixo}.parquet"]
+
+
+def _tamanho_pasta(pasta):
+    total = 0
+    for raiz, _, arquivos in os.walk(pasta):
+        for arquivo in arquivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, arquivo))
+            except OSError:
+                pass
+    return total
+
+
+def limitar_conversoes(diretorio, max_bytes=CONVERSAO_MAX_BYTES, manter=(), orfa_segundos=CONVERSAO_ORFA_SEGUNDOS):
+    """Remove as conversões usadas há mais tempo (pela data do manifesto) até caber em `max_bytes`.
+
+    Pastas sem manifesto modificadas há mais de `orfa_segundos` (conversões interrompidas)
+    são sempre removidas; as mais recentes (em andamento) e as de `manter` são preservadas.
+    """
+    concluidas, total = [], 0
+    limite_orfas = time.time() - orfa_segundos
+    for entrada in os.scandir(diretorio):
+        if not entrada.is_dir():
+            continue
+        if entrada.path not in manter:
+            try:
+                uso = os.stat(os.path.join(entrada.path, 'partes.json')).st_mtime
+            except OSError:
+                if entrada.stat().st_mtime < limite_orfas:
+                    shutil.rmtree(entrada.path, ignore_errors=True)
+                    continue
+                uso = None
+        tamanho = _tamanho_pasta(entrada.path)
+        total += tamanho
+        if entrada.path not in manter and uso is not None:
+            concluidas.append((uso, entrada.path, tamanho))
+    for _, pasta, tamanho in sorted(concluidas):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(pasta, ignore_errors=True)
+        total -= tamanho
+
+
+def converter_partes(arquivos, diretorio, max_workers=None, max_bytes=CONVERSAO_MAX_BYTES, hashes=None):
+    """Converte cada planilha (XLSX) e cada CSV de `arquivos` [(fonte, nome)] para Parquet.
+
+    As conversões rodam em paralelo em um pool de processos e ficam em `diretorio` (criado
+    só para o usuário), pelo hash do arquivo (`hashes`, se já calculados): um arquivo já
+    convertido não é lido de novo, e as conversões usadas há mais tempo são removidas acima
+    de `max_bytes`. CSVs são lidos e gravados em blocos; Parquets enviados são usados como
+    estão. Todas as partes são validadas; se alguma falhar, nada é devolvido e o erro lista
+    cada parte inválida. Retorna [(rótulo da parte, caminho ou fonte Parquet)], com uma
+    entrada por bloco nos CSVs.
+    """
+    if hashes is None:
+        hashes = [None] * len(arquivos)
+    partes, pendentes, manifestos, temporarios, erros = [], [], [], [], {}
+    convertidos, pastas = {}, set()
+    os.makedirs(diretorio, mode=0o700, exist_ok=True)
+    try:
+        for (fonte, nome), hash_fonte in zip(arquivos, hashes):
+            if nome.endswith('.parquet'):
+                _rebobinar(fonte)
+                try:
+                    validar_colunas(pq.read_schema(fonte).names)
+                except ValueError as e:
+                    erros[rotulo_parte(nome)] = e
+                _rebobinar(fonte)
+                partes.append((rotulo_parte(nome), [fonte]))
+                continue
+            pasta = os.path.join(diretorio, f"v{VERSAO_PROCESSAMENTO}-{hash_fonte or hash_arquivo(fonte)}")
+            pastas.add(pasta)
+            manifesto = os.path.join(pasta, 'partes.json')
+            if os.path.exists(manifesto):
+                with open(manifesto, encoding='utf-8') as arquivo:
+                    convertidas = json.load(arquivo)
+                caminhos = [[os.path.join(pasta, a) for a in c.get('arquivos', [])] for c in convertidas]
+                if all(c and all(os.path.exists(a) for a in c) for c in caminhos):
+                    os.utime(manifesto)  # marca o uso, para a remoção por antiguidade
+                    partes.extend((rotulo_parte(nome, c['folha']), a) for c, a in zip(convertidas, caminhos))
+                    continue
+            os.makedirs(pasta, mode=0o700, exist_ok=True)
+            origem = fonte
+            if hasattr(fonte, 'read'):
+                # Arquivo enviado: copiado para disco, para os workers lerem sem serializar o conteúdo
+                descritor, origem = tempfile.mkstemp(dir=pasta, suffix=os.path.splitext(nome)[1])
+                _rebobinar(fonte)
+                with os.fdopen(descritor, 'wb') as copia:
+                    shutil.copyfileobj(fonte, copia)
+                _rebobinar(fonte)
+                temporarios.append(origem)
+            if nome.endswith('.csv'):
+                folhas = [None]
+            else:
+                with pd.ExcelFile(origem) as livro:
+                    folhas = livro.sheet_names
+            convertidas = [(folha, (pasta, f"parte_{i}")) for i, folha in enumerate(folhas)]
+            for folha, destino in convertidas:
+                rotulo = rotulo_parte(nome, folha)
+                pendentes.append((rotulo, origem, nome, folha, *destino))
+                partes.append((rotulo, destino))
+            manifestos.append((manifesto, convertidas))
+
+        if len(pendentes) == 1:
+            rotulo, *argumentos = pendentes[0]
+            try:
+                convertidos[tuple(argumentos[-2:])] = _converter_parte(*argumentos)
+            except Exception as e:
+                erros[rotulo] = e
+        elif pendentes:
+            with ProcessPoolExecutor(max_workers=min(len(pendentes), max_workers or os.cpu_count())) as executor:
+                tarefas = {
+                    executor.submit(_converter_parte, *argumentos): (rotulo, tuple(argumentos[-2:]))
+                    for rotulo, *argumentos in pendentes
+                }
+                for tarefa in as_completed(tarefas):
+                    rotulo, destino = tarefas[tarefa]
+                    try:
+                        convertidos[destino] = tarefa.result()
+                    except Exception as e:
+                        erros[rotulo] = e
+    finally:
+        for temporario in temporarios:
+            os.remove(temporario)
+    # Manifesto gravado por último, só nos arquivos com todas as partes convertidas (reaproveitados
+    # mesmo que outro arquivo do envio seja inválido); as pastas dos demais são removidas
+    for manifesto, convertidas in manifestos:
+        if all(destino in convertidos for _, destino in convertidas):
+            conteudo = [{'folha': folha, 'arquivos': convertidos[destino]} for folha, destino in convertidas]
+            _gravar_atomico(manifesto, lambda caminho: _gravar_json(conteudo, caminho))
+        else:
+            shutil.rmtree(os.path.dirname(manifesto), ignore_errors=True)
+    limitar_conversoes(diretorio, max_bytes, manter=pastas)
+    if erros:
+        raise PartesInvalidasError({rotulo: erros[rotulo] for rotulo, _ in partes if rotulo in erros})
+    resultado = []
+    for rotulo, caminhos in partes:
+        if isinstance(caminhos, tuple):
+            # Parte convertida agora: (pasta, prefixo) -> arquivos gravados pelo worker
+            caminhos = [os.path.join(caminhos[0], arquivo) for arquivo in convertidos[caminhos]]
+        resultado.extend((rotulo, caminho) for caminho in caminhos)
+    return resultado
+
+
+def ler_partes(arquivos, criterios=CRITERIOS_PADRAO, diretorio=CONVERSAO_DIR, max_workers=None, hashes=None):
+    # Converte (ou reaproveita) e processa parte a parte, compactando cada uma antes da concatenação
+    if diretorio is None:
+        # Sem diretório configurado: conversão descartada assim que o portfólio é lido
+        with tempfile.TemporaryDirectory(prefix='esg_conversao_') as temporario:
+            return ler_partes(arquivos, criterios, temporario, max_workers, hashes)
+    partes = converter_partes(arquivos, diretorio, max_workers, hashes=hashes)
+    return concatenar_compactos([
+        compactar_tipos(processar_portfolio(pd.read_parquet(caminho), criterios)) for _, caminho in partes
+    ])
+
+
+def carregar_portfolios(arquivos, cache, criterios=CRITERIOS_PADRAO):
+    # Vários arquivos (e planilhas) formam um portfólio, identificado pelos hashes em ordem;
+    # os mesmos hashes nomeiam as conversões em disco, sem ler os arquivos de novo
+    hashes = [hash_arquivo(fonte) for fonte, _ in arquivos]
+    chave = f"v{VERSAO_PROCESSAMENTO}-partes-{hash_conteudo('|'.join(hashes).encode())}"
+    return chave, cache.obter(chave, lambda: ler_partes(arquivos, criterios, hashes=hashes))
+
+
+def carregar_portfolio_local(caminho, cache):
+    # Arquivos locais (ex.: saída do pipeline.py) são identificados por caminho, tamanho e data de modificação
+    info = os.stat(caminho)
+    identificacao = f"{os.path.abspath(caminho)}|{info.st_size}|{info.st_mtime_ns}"
+    chave = f"v{VERSAO_PROCESSAMENTO}-{hash_conteudo(identificacao.encode())}"
+    return chave, cache.obter(chave, lambda: ler_portfolio(caminho, caminho))
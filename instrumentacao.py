@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+# Desligada por padrão. 'tempo' mede tempo e linhas; qualquer outro valor mede também memória
+MODO_INSTRUMENTACAO = os.environ.get('ESG_INSTRUMENTACAO', '').strip().lower()
+# Arquivo JSON lines onde cada etapa medida é acrescentada
+LOG_INSTRUMENTACAO = os.environ.get('ESG_INSTRUMENTACAO_LOG', 'instrumentacao.jsonl')
+
+_trava_log = threading.Lock()
+
+
+def instrumentacao_ativa(modo=MODO_INSTRUMENTACAO):
+    return modo not in ('', '0', 'false', 'nao', 'não')
+
+
+class Instrumentacao:
+    """Tempo, pico de memória e linhas de cada etapa nomeada de uma execução do script.
+
+    Desligada, `etapa()` devolve um contexto vazio e não mede nada. O pico de memória vem
+    do tracemalloc, que é global ao processo: com várias sessões simultâneas ele inclui
+    alocações das outras sessões e serve só como aproximação.
+    """
+
+    def __init__(self, modo=MODO_INSTRUMENTACAO, caminho_log=LOG_INSTRUMENTACAO):
+        self.ativa = instrumentacao_ativa(modo)
+        self.memoria = self.ativa and modo != 'tempo'
+        self.caminho_log = caminho_log
+        self.sessao = uuid.uuid4().hex[:12]
+        self.execucao = 0
+        self.etapas = []
+        self._inicio_execucao = time.perf_counter()
+        self._pilha = []
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def nova_execucao(self):
+        # Chamada no início de cada execução completa do script
+        self.execucao += 1
+        self.etapas = []
+        self._inicio_execucao = time.perf_counter()
+
+    def segundos_execucao(self):
+        return time.perf_counter() - self._inicio_execucao
+
+    def etapa(self, nome):
+        """Contexto que mede o bloco; o dicionário devolvido aceita 'linhas' com o tamanho processado."""
+        if not self.ativa:
+            return nullcontext({})
+        return self._medir(nome)
+
+    @contextmanager
+    def _medir(self, nome):
+        registro = {'etapa': nome, 'linhas': None}
+        if self.memoria:
+            atual, pico = tracemalloc.get_traced_memory()
+            # Preserva o pico da etapa externa antes de zerar o contador para esta
+            if self._pilha:
+                self._pilha[-1]['pico'] = max(self._pilha[-1]['pico'], pico)
+            tracemalloc.reset_peak()
+            self._pilha.append({'inicio': atual, 'pico': 0})
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro['segundos'] = round(time.perf_counter() - inicio, 6)
+            registro['pico_memoria_bytes'] = None
+            if self.memoria:
+                quadro = self._pilha.pop()
+                pico = max(tracemalloc.get_traced_memory()[1], quadro['pico'])
+                registro['pico_memoria_bytes'] = max(pico - quadro['inicio'], 0)
+                if self._pilha:
+                    self._pilha[-1]['pico'] = max(self._pilha[-1]['pico'], pico)
+            registro['nivel'] = len(self._pilha)
+            self.etapas.append(registro)
+            self._gravar(registro)
+
+    def registrar(self, nome, valores):
+        # Métricas avulsas (ex.: contadores de cache) gravadas no mesmo log das etapas
+        if self.ativa:
+            self._gravar({'metrica': nome, **valores})
+
+    def _gravar(self, registro):
+        if not self.caminho_log:
+            return
+        linha = {
+            'data': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'sessao': self.sessao,
+            'execucao': self.execucao,
+            **registro,
+        }
+        with _trava_log, open(self.caminho_log, 'a', encoding='utf-8') as arquivo:
+            arquivo.write(json.dumps(linha, ensure_ascii=False) + '\n')
+
+    def resumo(self):
+        # Etapas da execução atual, na ordem em que terminaram
+        return [
+            {
+                'Etapa': '  ' * r['nivel'] + r['etapa'],
+                'Tempo (ms)': round(r['segundos'] * 1000, 1),
+                'Pico de memória (MB)': (
+                    round(r['pico_memoria_bytes'] / 1024 ** 2, 2) if r['pico_memoria_bytes'] is not None else None
+                ),
+                'Linhas': r['linhas'],
+            }
+            for r in self.etapas
+        ]
@@ -1,50 +1,108 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import base64
-import io
+import numpy as np
+import os
+
+from atualizacao import TotaisPortfolio, carregar_delta
+from benchmark_setor import CuboSetorial
+from busca import LIMITE_RESULTADOS, IndiceEmpresas
+from cenarios import COLUNAS_CRITERIOS, ROTULOS_CRITERIOS, CacheCenarios
+from dataset_particionado import PortfolioParticionado, kpis_dataframe
+from exportacao import FORMATOS, CacheExportacoes, nome_arquivo, tipo_mime
+from filtros import IndiceFiltros
+from graficos import (
+    LIMITE_EMPRESAS_GRAFICO, MODOS_GRAFICO, TOP_N_PADRAO, CacheFiguras, grafico_pontuacoes,
+    grafico_radar, grafico_radar_comparativo, grafico_ratings, grafico_sensibilidade
+)
+from ingestao import (
+    VERSAO_PROCESSAMENTO, CachePortfolios, PartesInvalidasError, carregar_portfolio, carregar_portfolio_local,
+    carregar_portfolios, compactar_tipos
+)
+from instrumentacao import Instrumentacao
+from paginacao import TAMANHOS_PAGINA, TabelaPaginada, total_paginas
+from processamento import CRITERIOS_PADRAO, ColunasFaltandoError, processar_portfolio
+from relatorios import FORMATOS_RESUMO, gerar_relatorio_empresa, gerar_zip_relatorios, nome_relatorio
 
 # Configuração da página
 st.set_page_config(page_title="Dashboard ESG, Emissões e Bonds", layout="wide")
 
-# Funções para download de arquivos
-def get_table_download_link(df, filename, text):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64}" download="{filename}">{text}</a>'
-    return href
-
-def get_table_download_link_excel(df, filename, text):
-    output = io.BytesIO()
-    writer = pd.ExcelWriter(output, engine='xlsxwriter')
-    df.to_excel(writer, index=False, sheet_name='Dados')
-    writer.close()
-    processed_data = output.getvalue()
-    b64 = base64.b64encode(processed_data).decode()
-    href = f'<a href="data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}" download="{filename}">{text}</a>'
-    return href
-
 # Título e Introdução
 st.title("Dashboard de Avaliação de Empresas - ESG, Emissões e Bonds")
 st.markdown("""
 Este dashboard permite visualizar e analisar indicadores ESG, emissões de CO2, indicadores de títulos de dívida (bonds) e status de conformidade das empresas. Você pode carregar seus próprios dados ou usar os dados de exemplo fornecidos.
 """)
 
+# Medição opcional de tempo e memória por etapa (ESG_INSTRUMENTACAO), mantida por sessão
+if 'instrumentacao' not in st.session_state:
+    st.session_state['instrumentacao'] = Instrumentacao()
+instrumentacao = st.session_state['instrumentacao']
+instrumentacao.nova_execucao()
+
 # Opção para carregar dados
 st.sidebar.header("📂 Carregar Dados")
-upload_file = st.sidebar.file_uploader("Faça upload do seu arquivo Excel ou CSV", type=['xlsx', 'csv'])
+arquivos_enviados = st.sidebar.file_uploader(
+    "Faça upload de um ou mais arquivos Excel, CSV ou Parquet", type=['xlsx', 'csv', 'parquet'],
+    accept_multiple_files=True,
+    help="Arquivos e planilhas são concatenados em um único portfólio, na ordem do envio."
+)
+
+# Portfólio pontuado pelo pipeline.py, usado quando nenhum arquivo é enviado
+PORTFOLIO_PONTUADO = os.environ.get('ESG_PORTFOLIO_PONTUADO')
+# Diretório de Parquets particionados (pipeline.py --particionar), consultado fora da memória
+PORTFOLIO_DATASET = os.environ.get('ESG_PORTFOLIO_DATASET')
+
+# Cache de portfólios processados, único no processo: sessões que abrem o mesmo arquivo
+# compartilham o DataFrame e seus derivados (somente leitura)
+@st.cache_resource
+def cache_compartilhado():
+    return CachePortfolios()
+
+
+cache_portfolios = cache_compartilhado()
+
 
-if upload_file is not None:
+@st.cache_resource
+def abrir_dataset(diretorio):
+    return PortfolioParticionado(diretorio)
+
+
+# Com um dataset particionado, df fica vazio: só a fatia filtrada é carregada (ver abaixo)
+portfolio_dataset = None
+if arquivos_enviados:
     try:
-        if upload_file.name.endswith('.csv'):
-            df = pd.read_csv(upload_file)
-        else:
-            df = pd.read_excel(upload_file)
+        with instrumentacao.etapa("carregamento") as etapa:
+            if len(arquivos_enviados) == 1 and not arquivos_enviados[0].name.endswith('.xlsx'):
+                chave_portfolio, df = carregar_portfolio(arquivos_enviados[0], arquivos_enviados[0].name, cache_portfolios)
+            else:
+                # Planilhas e arquivos convertidos em paralelo para Parquet, com cache da conversão
+                chave_portfolio, df = carregar_portfolios([(a, a.name) for a in arquivos_enviados], cache_portfolios)
+            etapa['linhas'] = len(df)
         st.success("Dados carregados com sucesso!")
+    except (ColunasFaltandoError, PartesInvalidasError) as e:
+        st.error(str(e))
+        st.stop()
     except Exception as e:
         st.error(f"Erro ao carregar o arquivo: {e}")
         st.stop()
+elif PORTFOLIO_DATASET:
+    try:
+        with instrumentacao.etapa("abertura do dataset") as etapa:
+            portfolio_dataset = abrir_dataset(PORTFOLIO_DATASET)
+            etapa['linhas'] = portfolio_dataset.n_linhas
+    except Exception as e:
+        st.error(f"Erro ao abrir o dataset {PORTFOLIO_DATASET}: {e}")
+        st.stop()
+    chave_portfolio, df = portfolio_dataset.chave, None
+    st.sidebar.caption(f"Dataset particionado com {portfolio_dataset.n_linhas:,} linhas, consultado sob demanda.")
+elif PORTFOLIO_PONTUADO:
+    # Portfólio já pontuado pelo pipeline.py, lido sem novo processamento
+    try:
+        with instrumentacao.etapa("carregamento") as etapa:
+            chave_portfolio, df = carregar_portfolio_local(PORTFOLIO_PONTUADO, cache_portfolios)
+            etapa['linhas'] = len(df)
+    except Exception as e:
+        st.error(f"Erro ao carregar o arquivo {PORTFOLIO_PONTUADO}: {e}")
+        st.stop()
 else:
     st.info("Dados Carregandos...")
     # Dados de exemplo expandidos com mais empresas e indicadores
@@ -100,150 +158,138 @@ else:
         'Total_Bonds_Issued': [500000, 750000, 300000, 450000, 600000, 800000, 350000, 900000, 400000, 700000],
         'Fator_emissao': [0.82, 0.02, 0.5, 0.1, 0.3, 0.25, 0.4, 0.35, 0.28, 0.22]
     }
-    df = pd.DataFrame(data)
-
-# Verificação de colunas necessárias
-required_columns = [
-    'CNPJ', 'Empresa', 'Setor', 'Valor_emprestimo', 'Fator_emissao',
-    'Empregos_Criados', 'ESG_Score', 'E_Score', 'S_Score', 'G_Score',
-    'Credit_Rating', 'YTM', 'Duration', 'Total_Bonds_Issued',
-    'Energia_Renovavel_Pcnt', 'Emissoes_CO2', 'Reducao_Residuos_Ton',
-    'Economia_Agua_M3', 'Meta_Carbono_Neutro', 'Certificacoes_Ambientais',
-    'Empregos_Vulneraveis', 'Beneficiarios_Projetos', 'Investimento_Social_K',
-    'Diversidade_Genero_Pcnt', 'Projetos_Comunidade',
-    'Transparencia_Score', 'Politicas_ESG',
-    'Comite_Sustentabilidade', 'Reportes_GRI'
-]
-missing_columns = [col for col in required_columns if col not in df.columns]
-if missing_columns:
-    st.error(f"Faltando colunas no DataFrame: {', '.join(missing_columns)}")
-    st.stop()
-
-# Processamento dos dados
-df['Emissoes_CO2'] = df['Valor_emprestimo'] * df['Fator_emissao']  # Em kgCO2
-df['Intensidade_carbono'] = df['Emissoes_CO2'] / df['Valor_emprestimo']
-df['Impacto_Social_Score'] = (df['Empregos_Criados'] + df['Beneficiarios_Projetos']/100) / 2
-
-# Avaliação de conformidade
-green_bond_threshold = {
-    'Energia_Renovavel_Pcnt': 40,
-    'Emissoes_CO2': 500000,
-    'Certificacoes_Ambientais': 2
-}
-social_bond_threshold = {
-    'Empregos_Criados': 40,
-    'Empregos_Vulneraveis': 10,
-    'Investimento_Social_K': 400
-}
-
-def avaliar_conformidade(row):
-    green_conformity = (
-        row['Energia_Renovavel_Pcnt'] >= green_bond_threshold['Energia_Renovavel_Pcnt'] and
-        row['Emissoes_CO2'] <= green_bond_threshold['Emissoes_CO2'] and
-        row['Certificacoes_Ambientais'] >= green_bond_threshold['Certificacoes_Ambientais']
-    )
-    social_conformity = (
-        row['Empregos_Criados'] >= social_bond_threshold['Empregos_Criados'] and
-        row['Empregos_Vulneraveis'] >= social_bond_threshold['Empregos_Vulneraveis'] and
-        row['Investimento_Social_K'] >= social_bond_threshold['Investimento_Social_K']
+    chave_portfolio = f"v{VERSAO_PROCESSAMENTO}-exemplo"
+    with instrumentacao.etapa("carregamento") as etapa:
+        df = cache_portfolios.obter(chave_portfolio, lambda: compactar_tipos(processar_portfolio(pd.DataFrame(data))))
+        etapa['linhas'] = len(df)
+
+# Arquivos delta (linhas novas ou alteradas, por CNPJ) aplicados em ordem sobre o portfólio em memória
+if portfolio_dataset is None:
+    arquivos_delta = st.sidebar.file_uploader(
+        "Atualização incremental (delta por CNPJ)", type=['xlsx', 'csv', 'parquet'],
+        accept_multiple_files=True, key='arquivos_delta'
     )
-    if green_conformity and social_conformity:
-        return 'Totalmente Conforme'
-    elif green_conformity:
-        return 'Conforme Green Bond'
-    elif social_conformity:
-        return 'Conforme Social Bond'
-    else:
-        return 'Não Conforme'
-
-df['Status_Conformidade'] = df.apply(avaliar_conformidade, axis=1)
-
-# Cálculo de Risco ESG
-def calcular_risco_esg(row):
-    risco_ambiental = (100 - row['E_Score']) * (row['Emissoes_CO2'] / 1000000)
-    risco_social = (100 - row['S_Score']) * (1 - row['Empregos_Vulneraveis']/row['Empregos_Criados'])
-    risco_governanca = (100 - row['G_Score']) * (1 if not row['Comite_Sustentabilidade'] else 0.5)
-    risco_total = (risco_ambiental + risco_social + risco_governanca) / 3
-    if risco_total < 30:
-        return 'Baixo'
-    elif risco_total < 60:
-        return 'Médio'
-    else:
-        return 'Alto'
-
-df['Risco_ESG'] = df.apply(calcular_risco_esg, axis=1)
-
-# Cálculo de médias do setor para benchmarking
-numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns
-
-# Certifique-se de NÃO excluir 'Emissoes_CO2' se você precisar usá-la posteriormente
-cols_to_exclude = ['Valor_emprestimo', 'Total_Bonds_Issued']  # Removido 'Emissoes_CO2'
-
-numeric_cols = [col for col in numeric_cols if col not in cols_to_exclude]
-
-# Agrupar por setor e calcular a média
-setor_media = df.groupby('Setor')[numeric_cols].mean().reset_index()
-
-# Verificação adicional para garantir que 'Emissoes_CO2' está presente
-if 'Emissoes_CO2' not in setor_media.columns:
-    st.error("A coluna 'Emissoes_CO2' não está presente no DataFrame de médias por setor.")
-    st.stop()
-
-# Cálculo de risco baseado em Credit Rating
-def calcular_risco(row):
-    if row['Credit_Rating'] in ['CCC', 'B', 'BB']:
-        return 'Alto Risco'
-    elif row['Credit_Rating'] in ['A', 'BBB', 'AA']:
-        return 'Baixo Risco'
-    else:
-        return 'Médio Risco'
+    for arquivo_delta in arquivos_delta or []:
+        try:
+            with instrumentacao.etapa("atualização incremental") as etapa:
+                chave_portfolio, df, resumo_delta = carregar_delta(
+                    arquivo_delta, arquivo_delta.name, chave_portfolio, df, cache_portfolios
+                )
+                etapa['linhas'] = len(df)
+        except ColunasFaltandoError as e:
+            st.sidebar.error(f"{arquivo_delta.name}: {e}")
+            break
+        except Exception as e:
+            st.sidebar.error(f"Erro ao aplicar o delta {arquivo_delta.name}: {e}")
+            break
+        if resumo_delta:
+            st.sidebar.success(
+                f"{arquivo_delta.name}: {resumo_delta['atualizadas']:,} linhas atualizadas, "
+                f"{resumo_delta['inseridas']:,} inseridas."
+            )
 
-df['Risk_Level'] = df.apply(calcular_risco, axis=1)
+# Memória ocupada pelo portfólio carregado, antes e depois da compactação de tipos
+if df is not None and df.attrs.get('bytes_antes_compactacao', 0) > df.attrs.get('bytes_compactado', 0):
+    st.sidebar.caption(
+        f"Portfólio em memória: {df.attrs['bytes_compactado'] / 1024 ** 2:,.1f} MB "
+        f"(sem compactação de tipos: {df.attrs['bytes_antes_compactacao'] / 1024 ** 2:,.1f} MB)"
+    )
 
 # Filtros Interativos
 st.sidebar.header("🔍 Filtros")
-setores = st.sidebar.multiselect("Selecione os Setores", options=df['Setor'].unique(), default=df['Setor'].unique())
-status_conformidade = st.sidebar.multiselect("Status de Conformidade", options=df['Status_Conformidade'].unique(), default=df['Status_Conformidade'].unique())
-esg_score_min = st.sidebar.slider("Pontuação ESG Mínima", min_value=0, max_value=100, value=int(df['ESG_Score'].min()))
-esg_score_max = st.sidebar.slider("Pontuação ESG Máxima", min_value=0, max_value=100, value=int(df['ESG_Score'].max()))
-credit_ratings = st.sidebar.multiselect("Selecione os Ratings de Crédito", options=df['Credit_Rating'].unique(), default=df['Credit_Rating'].unique())
+if portfolio_dataset is None:
+    # Índice dos filtros, construído uma vez por portfólio
+    with instrumentacao.etapa("índice de filtros"):
+        indice_filtros = cache_portfolios.obter_derivado(chave_portfolio, 'indice_filtros', lambda: IndiceFiltros(df))
+    opcoes_filtros = indice_filtros
+    # Últimas máscaras de cada filtro: da sessão, pois o índice é compartilhado entre sessões
+    if st.session_state.get('ultimas_mascaras', (None,))[0] != chave_portfolio:
+        st.session_state['ultimas_mascaras'] = (chave_portfolio, {})
+    ultimas_mascaras = st.session_state['ultimas_mascaras'][1]
+    esg_extremos = (df['ESG_Score'].min(), df['ESG_Score'].max())
+else:
+    # Opções e extremos lidos do dataset (partições ou uma coluna por vez)
+    opcoes_filtros = portfolio_dataset
+    esg_extremos = portfolio_dataset.extremos('ESG_Score')
+
+setores = st.sidebar.multiselect("Selecione os Setores", options=opcoes_filtros.valores('Setor'), default=opcoes_filtros.valores('Setor'))
+status_conformidade = st.sidebar.multiselect("Status de Conformidade", options=opcoes_filtros.valores('Status_Conformidade'), default=opcoes_filtros.valores('Status_Conformidade'))
+esg_score_min = st.sidebar.slider("Pontuação ESG Mínima", min_value=0, max_value=100, value=int(esg_extremos[0]))
+esg_score_max = st.sidebar.slider("Pontuação ESG Máxima", min_value=0, max_value=100, value=int(esg_extremos[1]))
+credit_ratings = st.sidebar.multiselect("Selecione os Ratings de Crédito", options=opcoes_filtros.valores('Credit_Rating'), default=opcoes_filtros.valores('Credit_Rating'))
 ytm_min = st.sidebar.slider("Yield to Maturity (YTM) Mínimo (%)", min_value=0.0, max_value=20.0, value=0.0)
 ytm_max = st.sidebar.slider("Yield to Maturity (YTM) Máximo (%)", min_value=0.0, max_value=20.0, value=20.0)
 
-df_filtered = df[
-    (df['Setor'].isin(setores)) &
-    (df['Status_Conformidade'].isin(status_conformidade)) &
-    (df['ESG_Score'] >= esg_score_min) &
-    (df['ESG_Score'] <= esg_score_max) &
-    (df['Credit_Rating'].isin(credit_ratings)) &
-    (df['YTM'] >= ytm_min) &
-    (df['YTM'] <= ytm_max)
-]
+filtros_categorias = {
+    'Setor': setores,
+    'Status_Conformidade': status_conformidade,
+    'Credit_Rating': credit_ratings
+}
+filtros_faixas = {
+    'ESG_Score': (esg_score_min, esg_score_max),
+    'YTM': (ytm_min, ytm_max)
+}
+chave_fatia = (chave_portfolio, repr(filtros_categorias), repr(filtros_faixas))
+if portfolio_dataset is None:
+    # A visão filtrada e seus KPIs ficam na sessão até os filtros mudarem
+    if st.session_state.get('visao_filtrada', (None,))[0] != chave_fatia:
+        with instrumentacao.etapa("filtragem") as etapa:
+            df_visao = indice_filtros.filtrar(
+                df, categorias=filtros_categorias, faixas=filtros_faixas, ultimas=ultimas_mascaras
+            )
+            etapa['linhas'] = len(df_visao)
+        if len(df_visao) == len(df):
+            # Sem filtro efetivo: totais do portfólio, ajustados a cada delta em vez de recalculados
+            kpis_visao = cache_portfolios.obter_derivado(chave_portfolio, 'totais', lambda: TotaisPortfolio(df)).kpis()
+        else:
+            kpis_visao = kpis_dataframe(df_visao)
+        st.session_state['visao_filtrada'] = (chave_fatia, df_visao, kpis_visao)
+    _, df_filtered, kpis = st.session_state['visao_filtrada']
+else:
+    # Filtros enviados ao pyarrow; a fatia lida fica na sessão até os filtros mudarem
+    if st.session_state.get('fatia_dataset', (None,))[0] != chave_fatia:
+        with instrumentacao.etapa("consulta ao dataset") as etapa:
+            df_fatia, total_filtrado = portfolio_dataset.materializar(filtros_categorias, filtros_faixas)
+            etapa['linhas'] = len(df_fatia)
+        st.session_state['fatia_dataset'] = (chave_fatia, df_fatia, total_filtrado)
+    _, df_filtered, total_filtrado = st.session_state['fatia_dataset']
+    with instrumentacao.etapa("KPIs em streaming") as etapa:
+        kpis = portfolio_dataset.kpis(filtros_categorias, filtros_faixas)
+        etapa['linhas'] = total_filtrado
+    if total_filtrado > len(df_filtered):
+        st.warning(
+            f"Os filtros selecionam {total_filtrado:,} linhas; tabelas, gráficos e exportações usam as "
+            f"primeiras {len(df_filtered):,}. Os KPIs e as médias por setor consideram todas."
+        )
+
+# Configuração dos gráficos por empresa
+st.sidebar.header("📊 Gráficos")
+modo_grafico = st.sidebar.selectbox(
+    "Modo de visualização", MODOS_GRAFICO,
+    help=f"No modo automático, acima de {LIMITE_EMPRESAS_GRAFICO} empresas os gráficos mostram apenas o Top N."
+)
+top_n_grafico = st.sidebar.slider("Quantidade de empresas no Top N", min_value=5, max_value=100, value=TOP_N_PADRAO)
+
+# Identifica o portfólio e os filtros aplicados (chave para caches da visão filtrada)
+estado_filtros = (
+    chave_portfolio, tuple(setores), tuple(status_conformidade), tuple(credit_ratings),
+    esg_score_min, esg_score_max, ytm_min, ytm_max
+)
 
 # Resumo de KPIs
 st.header("Resumo dos Indicadores")
 col1, col2, col3, col4, col5 = st.columns(5)
 with col1:
-    total_empresas = df_filtered['Empresa'].nunique()
-    st.metric("Total de Empresas", total_empresas)
+    st.metric("Total de Empresas", kpis['total_empresas'])
 with col2:
-    media_esg = df_filtered['ESG_Score'].mean()
-    st.metric("Média da Pontuação ESG", f"{media_esg:.2f}")
+    st.metric("Média da Pontuação ESG", f"{kpis['media_esg']:.2f}")
 with col3:
-    total_emissoes = df_filtered['Emissoes_CO2'].sum()
-    st.metric("Total de Emissões de CO2", f"{total_emissoes:,.2f} kg")
+    st.metric("Total de Emissões de CO2", f"{kpis['total_emissoes']:,.2f} kg")
 with col4:
-    empresas_aprovadas = df_filtered[
-        df_filtered['Status_Conformidade'].isin([
-            'Totalmente Conforme',
-            'Conforme Green Bond',
-            'Conforme Social Bond'
-        ])
-    ]['Empresa'].nunique()
-    st.metric("Empresas Aprovadas", empresas_aprovadas)
+    # Empresas em qualquer status de conformidade exceto "Não Conforme"
+    st.metric("Empresas Aprovadas", kpis['empresas_aprovadas'])
 with col5:
-    media_ytm = df_filtered['YTM'].mean()
-    st.metric("Média do YTM (%)", f"{media_ytm:.2f}%")
+    st.metric("Média do YTM (%)", f"{kpis['media_ytm']:.2f}%")
     
     
 # #####################################################################
@@ -253,104 +299,173 @@ with col5:
 # ######################################################################
 
 
-# Botão para download dos dados filtrados
-st.markdown(get_table_download_link(df_filtered, 'dados_filtrados.csv', '📥 Baixar Dados Filtrados'), unsafe_allow_html=True)
+# Download dos dados filtrados: o arquivo só é gerado quando solicitado e fica em cache por filtro/formato
+if 'cache_exportacoes' not in st.session_state:
+    st.session_state['cache_exportacoes'] = CacheExportacoes()
+cache_exportacoes = st.session_state['cache_exportacoes']
+
+
+@st.fragment
+def secao_exportacao(df_filtered, estado_filtros):
+    with st.expander("📥 Baixar Dados Filtrados"):
+        formato_exportacao = st.selectbox("Formato do arquivo", list(FORMATOS))
+        dados_exportacao = cache_exportacoes.obter(estado_filtros, formato_exportacao)
+        if dados_exportacao is None and st.button("Preparar arquivo"):
+            try:
+                with st.spinner("Gerando arquivo..."), instrumentacao.etapa(f"exportação {formato_exportacao}") as etapa:
+                    etapa['linhas'] = len(df_filtered)
+                    dados_exportacao = cache_exportacoes.gerar(df_filtered, estado_filtros, formato_exportacao)
+            except ValueError as e:
+                st.error(str(e))
+        if dados_exportacao is not None:
+            st.download_button(
+                label="📥 Baixar Dados Filtrados",
+                data=dados_exportacao,
+                file_name=nome_arquivo('dados_filtrados', formato_exportacao),
+                mime=tipo_mime(formato_exportacao)
+            )
+
+
+secao_exportacao(df_filtered, estado_filtros)
+
+# Figuras já construídas, reaproveitadas entre reruns e trocas de aba
+if 'cache_figuras' not in st.session_state:
+    st.session_state['cache_figuras'] = CacheFiguras()
+cache_figuras = st.session_state['cache_figuras']
 
-# Organização em abas
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
+# Simulações de limites de conformidade, por filtros e grade de cenários
+if 'cache_cenarios' not in st.session_state:
+    st.session_state['cache_cenarios'] = CacheCenarios()
+cache_cenarios = st.session_state['cache_cenarios']
+
+# Seções do dashboard. Cada seção interativa é um fragmento: seus widgets reexecutam
+# apenas a própria seção, e só a seção ativa é calculada a cada execução.
+ABAS = [
     "📊 Dados das Empresas",
     "📈 Análises Visuais",
     "📉 Benchmarking",
     "📊 Bonds",
     "ℹ️ Sobre os Indicadores",
     "📈 Análises Detalhadas",
-    "📊 Análise Comparativa"
-])
+    "📊 Análise Comparativa",
+    "🧪 Simulação de Limites"
+]
+
 
-with tab1:
+@st.fragment
+def aba_dados_empresas(df_filtered, estado_filtros):
     st.header("Dados das Empresas")
-    st.dataframe(df_filtered[
-        ['CNPJ', 'Empresa', 'Setor', 'Valor_emprestimo', 'Emissoes_CO2', 'Intensidade_carbono',
-         'ESG_Score', 'E_Score', 'S_Score', 'G_Score', 'Empregos_Criados',
-         'Credit_Rating', 'YTM', 'Duration', 'Total_Bonds_Issued', 'Risk_Level', 'Status_Conformidade']
-    ])
+    colunas_tabela = [
+        'CNPJ', 'Empresa', 'Setor', 'Valor_emprestimo', 'Emissoes_CO2', 'Intensidade_carbono',
+        'ESG_Score', 'E_Score', 'S_Score', 'G_Score', 'Empregos_Criados',
+        'Credit_Rating', 'YTM', 'Duration', 'Total_Bonds_Issued', 'Risk_Level', 'Status_Conformidade'
+    ]
+    # Ordenação e paginação feitas no servidor: só a página visível é enviada ao navegador
+    if 'tabela_empresas' not in st.session_state:
+        st.session_state['tabela_empresas'] = TabelaPaginada()
+    tabela_empresas = st.session_state['tabela_empresas']
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        coluna_ordenacao = st.selectbox("Ordenar por", colunas_tabela, index=colunas_tabela.index('Empresa'))
+    with col2:
+        ordem_crescente = st.radio("Ordem", ["Crescente", "Decrescente"], horizontal=True) == "Crescente"
+    with col3:
+        tamanho_pagina = st.selectbox("Linhas por página", TAMANHOS_PAGINA, index=1)
+    with col4:
+        n_paginas = total_paginas(len(df_filtered), tamanho_pagina)
+        pagina_atual = st.number_input("Página", min_value=1, max_value=n_paginas, value=1, step=1)
 
-with tab2:
+    with instrumentacao.etapa("ordenação e paginação") as etapa:
+        df_pagina = tabela_empresas.pagina(
+            df_filtered, estado_filtros, coluna_ordenacao, ordem_crescente, pagina_atual, tamanho_pagina
+        )
+        etapa['linhas'] = len(df_filtered)
+    inicio_pagina = (pagina_atual - 1) * tamanho_pagina
+    st.caption(
+        f"Exibindo linhas {min(inicio_pagina + 1, len(df_filtered)):,}–{inicio_pagina + len(df_pagina):,} "
+        f"de {len(df_filtered):,} (página {pagina_atual} de {n_paginas})"
+    )
+    with instrumentacao.etapa("tabela (st.dataframe)") as etapa:
+        st.dataframe(df_pagina[colunas_tabela])
+        etapa['linhas'] = len(df_pagina)
+
+
+@st.fragment
+def aba_analises_visuais(df_filtered, estado_filtros, modo_grafico, top_n_grafico):
     st.header("Análises Visuais")
     # Exemplo: Gráfico de Subpontuações ESG com Labels
     st.subheader("Subpontuações ESG por Empresa")
-    df_melted = df_filtered.melt(id_vars=['Empresa'], value_vars=['E_Score', 'S_Score', 'G_Score'],
-                                 var_name='Categoria', value_name='Pontuação')
-    fig_subscores = px.bar(
-        df_melted,
-        x='Empresa',
-        y='Pontuação',
-        color='Categoria',
-        barmode='group',
-        title='Subpontuações ESG por Empresa',
-        height=400,
-        text='Pontuação'  # Adiciona rótulos
-    )
-    fig_subscores.update_traces(texttemplate='%{text:.2f}', textposition='outside')
-    fig_subscores.update_layout(uniformtext_minsize=8, uniformtext_mode='hide')
-    st.plotly_chart(fig_subscores, use_container_width=True)
+    with instrumentacao.etapa("gráfico de subpontuações") as etapa:
+        fig_subscores = cache_figuras.obter(
+            (estado_filtros, 'subscores', modo_grafico, top_n_grafico),
+            lambda: grafico_pontuacoes(
+                df_filtered, ['E_Score', 'S_Score', 'G_Score'], 'Categoria', 'Pontuação',
+                'Subpontuações ESG por Empresa', modo_grafico, top_n_grafico
+            )
+        )
+        st.plotly_chart(fig_subscores, use_container_width=True)
+        etapa['linhas'] = len(df_filtered)
     
     # Adicione outros gráficos conforme necessário
 
-with tab3:
+
+@st.fragment
+def aba_benchmarking(df_filtered, estado_filtros, cubo_setorial, medias_setores, escopo_cubo, modo_grafico, top_n_grafico):
     st.header("Benchmarking por Setor")
-    setor_selecionado = st.selectbox("Selecione um Setor para Benchmarking", options=setor_media['Setor'].unique())
-    media_setor = setor_media[setor_media['Setor'] == setor_selecionado]
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("Média ESG Score do Setor", f"{media_setor['ESG_Score'].values[0]:.2f}")
-    with col2:
-        st.metric("Média Emissões CO2 do Setor", f"{media_setor['Emissoes_CO2'].values[0]:,.2f} kg")
-    with col3:
-        st.metric("Média Empregos Criados do Setor", f"{media_setor['Empregos_Criados'].values[0]:.2f}")
-    with col4:
-        st.metric("Média YTM do Setor (%)", f"{media_setor['YTM'].values[0]:.2f}%")
+    setor_selecionado = st.selectbox("Selecione um Setor para Benchmarking", options=cubo_setorial.setores)
+    if setor_selecionado in medias_setores.index:
+        media_setor = medias_setores.loc[setor_selecionado]
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Média ESG Score do Setor", f"{media_setor['ESG_Score']:.2f}")
+        with col2:
+            st.metric("Média Emissões CO2 do Setor", f"{media_setor['Emissoes_CO2']:,.2f} kg")
+        with col3:
+            st.metric("Média Empregos Criados do Setor", f"{media_setor['Empregos_Criados']:.2f}")
+        with col4:
+            st.metric("Média YTM do Setor (%)", f"{media_setor['YTM']:.2f}%")
+    else:
+        st.info(f"Nenhuma empresa do setor {setor_selecionado} atende aos filtros selecionados.")
+
+    # Distribuição no portfólio completo, a partir do cubo
+    indicadores_benchmark = ['ESG_Score', 'Emissoes_CO2', 'Empregos_Criados', 'YTM']
+    st.subheader(f"Distribuição dos Indicadores do Setor {setor_selecionado} ({escopo_cubo})")
+    st.dataframe(cubo_setorial.resumo(setor_selecionado, indicadores_benchmark))
+    dimensao_detalhe = st.radio("Detalhar setor por", ['Credit_Rating', 'Status_Conformidade'], horizontal=True)
+    st.dataframe(cubo_setorial.detalhamento(setor_selecionado, dimensao_detalhe, indicadores_benchmark))
     
     # Comparação com a média do setor
     st.subheader(f"Comparação das Empresas do Setor {setor_selecionado}")
-    df_setor = df_filtered[df_filtered['Setor'] == setor_selecionado]
-    fig_comparacao = px.bar(
-        df_setor.melt(id_vars=['Empresa'], value_vars=['ESG_Score', 'E_Score', 'S_Score', 'G_Score'],
-                     var_name='Pontuação', value_name='Valor'),
-        x='Empresa',
-        y='Valor',
-        color='Pontuação',
-        barmode='group',
-        title=f"Pontuações ESG das Empresas do Setor {setor_selecionado}",
-        height=400,
-        text='Valor'  # Adiciona rótulos
-    )
-    fig_comparacao.update_traces(texttemplate='%{text:.2f}', textposition='outside')
-    fig_comparacao.update_layout(uniformtext_minsize=8, uniformtext_mode='hide')
-    st.plotly_chart(fig_comparacao, use_container_width=True)
+    with instrumentacao.etapa("gráfico do setor"):
+        fig_comparacao = cache_figuras.obter(
+            (estado_filtros, 'comparacao_setor', setor_selecionado, modo_grafico, top_n_grafico),
+            lambda: grafico_pontuacoes(
+                df_filtered[df_filtered['Setor'] == setor_selecionado],
+                ['ESG_Score', 'E_Score', 'S_Score', 'G_Score'], 'Pontuação', 'Valor',
+                f"Pontuações ESG das Empresas do Setor {setor_selecionado}", modo_grafico, top_n_grafico
+            )
+        )
+        st.plotly_chart(fig_comparacao, use_container_width=True)
+
 
-with tab4:
+@st.fragment
+def aba_bonds(df_filtered, estado_filtros, modo_grafico, top_n_grafico):
     st.header("Indicadores de Bonds")
     # Exemplo: Gráfico de Ratings de Crédito com Tooltips Detalhados
     st.subheader("Ratings de Crédito das Empresas")
-    fig_rating = px.bar(
-        df_filtered,
-        x='Empresa',
-        y='Credit_Rating',
-        color='Credit_Rating',
-        title='Ratings de Crédito das Empresas',
-        height=400,
-        hover_data={
-            'Empresa': True,
-            'Credit_Rating': True,
-            'ESG_Score': True
-        }
-    )
-    st.plotly_chart(fig_rating, use_container_width=True)
+    with instrumentacao.etapa("gráfico de ratings") as etapa:
+        fig_rating = cache_figuras.obter(
+            (estado_filtros, 'ratings', modo_grafico, top_n_grafico),
+            lambda: grafico_ratings(df_filtered, modo_grafico, top_n_grafico)
+        )
+        st.plotly_chart(fig_rating, use_container_width=True)
+        etapa['linhas'] = len(df_filtered)
     
     # Adicione outros gráficos conforme necessário
 
-with tab5:
+
+def aba_sobre_indicadores():
     st.header("Sobre os Indicadores")
     st.markdown("""
     **Pontuação ESG**: Avaliação geral da empresa em termos ambientais, sociais e de governança.
@@ -377,39 +492,38 @@ with tab5:
     
     **Risk_Level**: Nível de risco baseado no Credit Rating:
     
-    - **Baixo Risco**: Ratings de crédito como A, BBB, AA.
-    - **Médio Risco**: Ratings intermediários.
-    - **Alto Risco**: Ratings de crédito como CCC, B, BB.
+    - **Baixo Risco**: Grau de investimento (AAA a BBB- ou Aaa a Baa3), como A, BBB, AA.
+    - **Médio Risco**: Ratings não reconhecidos ou sem classificação (ex.: NR).
+    - **Alto Risco**: Grau especulativo (BB+ a D ou Ba1 a C), como CCC, B, BB.
+    
+    **Risco ESG**: Classificação (Baixo, Médio ou Alto) do risco ESG total, que combina os riscos ambiental, social e de governança. O valor numérico fica disponível em Risco_ESG_Total.
     
     **Status de Conformidade**: Indica se a empresa está "Totalmente Conforme", "Conforme Green Bond", "Conforme Social Bond" ou "Não Conforme" com base nos critérios definidos (pontuação ESG, empregos criados, etc.).
     """)
 
-with tab6:
+
+@st.fragment
+def aba_analises_detalhadas(df_filtered, estado_filtros, visao_empresas):
     st.header("📈 Análises Detalhadas")
-    # Seletor de empresa para análise detalhada
-    empresa_selecionada = st.selectbox("Selecione uma empresa para análise detalhada", df_filtered['Empresa'].unique())
-    empresa_data = df_filtered[df_filtered['Empresa'] == empresa_selecionada].iloc[0]
+    # Seletor de empresa para análise detalhada: só as empresas encontradas pela busca vão para o navegador
+    busca = st.text_input("Buscar empresa (nome ou CNPJ)", key='busca_empresa_detalhada')
+    opcoes, encontradas = visao_empresas.buscar(busca, LIMITE_RESULTADOS)
+    if not opcoes:
+        st.info("Nenhuma empresa da visão filtrada corresponde à busca.")
+        return
+    if encontradas > len(opcoes):
+        st.caption(f"{encontradas:,} empresas encontradas; mostrando as {len(opcoes)} primeiras. Refine a busca.")
+    empresa_selecionada = st.selectbox("Selecione uma empresa para análise detalhada", opcoes)
+    linhas_empresa = visao_empresas.linhas(empresa_selecionada)
+    empresa_data = linhas_empresa.iloc[0]
     
     # Radar chart com múltiplos indicadores
     categories = ['E_Score', 'S_Score', 'G_Score', 'Transparencia_Score']
     values = [empresa_data[cat] for cat in categories]
     
-    fig_radar = go.Figure(data=go.Scatterpolar(
-        r=values,
-        theta=['Ambiental', 'Social', 'Governança', 'Transparência'],
-        fill='toself',
-        marker=dict(color='green')
-    ))
-    
-    fig_radar.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                range=[0, 100]
-            )
-        ),
-        showlegend=False,
-        title='Análise Multi-dimensional'
+    fig_radar = cache_figuras.obter(
+        (estado_filtros, 'radar', empresa_selecionada),
+        lambda: grafico_radar(values)
     )
     
     st.plotly_chart(fig_radar, use_container_width=True)
@@ -422,52 +536,8 @@ with tab6:
         'Empregos_Criados', 'Investimento_Social_K',
         'Status_Conformidade'
     ]
-    st.dataframe(df_filtered[df_filtered['Empresa'] == empresa_selecionada][detailed_cols])
+    st.dataframe(linhas_empresa[detailed_cols])
     
-    # Função para gerar relatório da empresa
-    def gerar_relatorio_empresa(empresa_data):
-        report = f"""Relatório de Análise ESG - {empresa_data['Empresa']}
-1. INFORMAÇÕES GERAIS
----------------------
-CNPJ: {empresa_data['CNPJ']}
-Setor: {empresa_data['Setor']}
-Valor do Empréstimo: R$ {empresa_data['Valor_emprestimo']:,.2f}
-Status de Conformidade: {empresa_data['Status_Conformidade']}
-
-2. INDICADORES AMBIENTAIS
--------------------------
-Emissões CO2: {empresa_data['Emissoes_CO2']:,.2f} kg
-Energia Renovável: {empresa_data['Energia_Renovavel_Pcnt']}%
-Redução de Resíduos: {empresa_data['Reducao_Residuos_Ton']} ton
-Economia de Água: {empresa_data['Economia_Agua_M3']} m³
-Meta Carbono Neutro: {empresa_data['Meta_Carbono_Neutro']}
-Certificações: {empresa_data['Certificacoes_Ambientais']}
-
-3. INDICADORES SOCIAIS
-----------------------
-Empregos Criados: {empresa_data['Empregos_Criados']}
-Empregos Vulneráveis: {empresa_data['Empregos_Vulneraveis']}
-Beneficiários: {empresa_data['Beneficiarios_Projetos']}
-Investimento Social: R$ {empresa_data['Investimento_Social_K']*1000:,.2f}
-Diversidade de Gênero: {empresa_data['Diversidade_Genero_Pcnt']}%
-Projetos na Comunidade: {empresa_data['Projetos_Comunidade']}
-
-4. PONTUAÇÕES ESG
------------------
-ESG Score Total: {empresa_data['ESG_Score']}
-Score Ambiental: {empresa_data['E_Score']}
-Score Social: {empresa_data['S_Score']}
-Score Governança: {empresa_data['G_Score']}
-
-5. GOVERNANÇA
--------------
-Transparência: {empresa_data['Transparencia_Score']}
-Políticas ESG: {'Sim' if empresa_data['Politicas_ESG'] else 'Não'}
-Comitê de Sustentabilidade: {'Sim' if empresa_data['Comite_Sustentabilidade'] else 'Não'}
-Relatórios GRI: {'Sim' if empresa_data['Reportes_GRI'] else 'Não'}
-"""
-        return report
-
     # Botão para gerar e baixar relatório
     if st.button("Gerar Relatório"):
         relatorio = gerar_relatorio_empresa(empresa_data)
@@ -477,39 +547,66 @@ Relatórios GRI: {'Sim' if empresa_data['Reportes_GRI'] else 'Não'}
         st.download_button(
             label="📥 Baixar Relatório (TXT)",
             data=relatorio,
-            file_name=f"relatorio_{empresa_selecionada.replace(' ', '_')}.txt",
+            file_name=nome_relatorio(empresa_selecionada),
             mime="text/plain"
         )
 
-with tab7:
+    # Relatórios de todas as empresas filtradas, gerados em paralelo e compactados em ZIP
+    st.subheader("Relatórios em Lote")
+    st.caption(f"Gera um relatório TXT para cada uma das {len(df_filtered):,} empresas filtradas, em um único arquivo ZIP.")
+    formato_resumo = st.selectbox("Resumo consolidado no ZIP", FORMATOS_RESUMO)
+    chave_lote = (estado_filtros, formato_resumo)
+    if st.session_state.get('relatorios_lote', (None, None))[0] != chave_lote:
+        if st.button("Gerar Relatórios em Lote"):
+            barra_progresso = st.progress(0.0, text="Gerando relatórios...")
+            with instrumentacao.etapa("relatórios em lote") as etapa:
+                arquivo_lote = gerar_zip_relatorios(
+                    df_filtered,
+                    formato_resumo=formato_resumo,
+                    progresso=lambda feitos, total: barra_progresso.progress(
+                        feitos / total, text=f"{feitos:,} de {total:,} relatórios gerados"
+                    )
+                )
+                etapa['linhas'] = len(df_filtered)
+            barra_progresso.empty()
+            st.session_state['relatorios_lote'] = (chave_lote, arquivo_lote.getvalue())
+    if st.session_state.get('relatorios_lote', (None, None))[0] == chave_lote:
+        st.download_button(
+            label="📥 Baixar Relatórios (ZIP)",
+            data=st.session_state['relatorios_lote'][1],
+            file_name="relatorios_esg.zip",
+            mime="application/zip"
+        )
+
+
+@st.fragment
+def aba_analise_comparativa(df_filtered, estado_filtros, visao_empresas):
     st.header("📊 Análise Comparativa")
     st.subheader("Comparação de Empresas")
     
-    # Seleção de empresas para comparação
+    # Seleção de empresas para comparação: as já escolhidas continuam entre as opções a cada nova busca
+    chave_selecao = ('empresas_comparacao', estado_filtros)
+    if st.session_state.get('selecao_comparacao', (None,))[0] != chave_selecao:
+        st.session_state['selecao_comparacao'] = (chave_selecao, visao_empresas.primeiras(3))
+    selecionadas = st.session_state['selecao_comparacao'][1]
+    busca = st.text_input("Buscar empresas (nome ou CNPJ)", key='busca_empresa_comparacao')
+    encontradas, total_encontradas = visao_empresas.buscar(busca, LIMITE_RESULTADOS)
+    if total_encontradas > len(encontradas):
+        st.caption(f"{total_encontradas:,} empresas encontradas; mostrando as {len(encontradas)} primeiras. Refine a busca.")
     empresas_comparacao = st.multiselect(
         "Selecione até 3 empresas para comparação",
-        df_filtered['Empresa'].unique(),
-        default=df_filtered['Empresa'].unique()[:3]
+        selecionadas + [e for e in encontradas if e not in selecionadas],
+        default=selecionadas
     )
+    st.session_state['selecao_comparacao'] = (chave_selecao, empresas_comparacao)
     
     if empresas_comparacao:
-        df_comparacao = df_filtered[df_filtered['Empresa'].isin(empresas_comparacao)]
+        df_comparacao = visao_empresas.linhas(empresas_comparacao)
         
         # Gráfico de radar comparativo
-        fig_radar_comp = go.Figure()
-        for empresa in empresas_comparacao:
-            empresa_data = df_comparacao[df_comparacao['Empresa'] == empresa].iloc[0]
-            fig_radar_comp.add_trace(go.Scatterpolar(
-                r=[empresa_data['E_Score'], empresa_data['S_Score'], empresa_data['G_Score'], empresa_data['Transparencia_Score']],
-                theta=['Ambiental', 'Social', 'Governança', 'Transparência'],
-                fill='toself',
-                name=empresa
-            ))
-        
-        fig_radar_comp.update_layout(
-            polar=dict(radialaxis=dict(visible=True, range=[0, 100])),
-            showlegend=True,
-            title='Comparação de Scores ESG'
+        fig_radar_comp = cache_figuras.obter(
+            (estado_filtros, 'radar_comparativo', tuple(empresas_comparacao)),
+            lambda: grafico_radar_comparativo(df_comparacao, empresas_comparacao)
         )
         
         st.plotly_chart(fig_radar_comp, use_container_width=True)
@@ -519,6 +616,117 @@ with tab7:
         comparacao_cols = ['Empresa', 'E_Score', 'S_Score', 'G_Score', 'Transparencia_Score']
         st.dataframe(df_comparacao[comparacao_cols])
 
+
+@st.fragment
+def aba_simulacao_limites(df_filtered, estado_filtros):
+    st.header("🧪 Simulação de Limites de Conformidade")
+    st.caption(
+        f"Reavalia a conformidade das {len(df_filtered):,} linhas filtradas para uma faixa de valores de um "
+        "critério, com os demais critérios nos limites atuais."
+    )
+    campo = st.selectbox("Critério", list(COLUNAS_CRITERIOS), format_func=ROTULOS_CRITERIOS.get)
+    valor_atual = getattr(CRITERIOS_PADRAO, campo)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        minimo = st.number_input("Limite inicial", value=0.0, key=f"simulacao_minimo_{campo}")
+    with col2:
+        maximo = st.number_input("Limite final", value=float(2 * valor_atual), key=f"simulacao_maximo_{campo}")
+    with col3:
+        n_cenarios = st.number_input("Cenários", min_value=2, max_value=201, value=21, step=1)
+    if maximo < minimo:
+        st.warning("O limite final deve ser maior ou igual ao inicial.")
+        return
+    grade = {campo: tuple(np.unique(np.linspace(minimo, maximo, int(n_cenarios)).round(6)))}
+
+    with instrumentacao.etapa("simulação de limites") as etapa:
+        resultado = cache_cenarios.obter(df_filtered, estado_filtros, grade)
+        etapa['linhas'] = len(df_filtered) * len(grade[campo])
+    for medida, titulo in [('Quantidade', "Empréstimos por status"), ('Valor_emprestimo', "Valor emprestado por status")]:
+        fig = cache_figuras.obter(
+            (estado_filtros, 'sensibilidade', campo, grade[campo], medida),
+            lambda: grafico_sensibilidade(
+                resultado, campo, ROTULOS_CRITERIOS[campo], medida, f"{titulo} x {ROTULOS_CRITERIOS[campo]}", valor_atual
+            )
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    tabela = resultado.pivot_table(
+        index=campo, columns='Status_Conformidade', values=['Quantidade', 'Valor_emprestimo'],
+        aggfunc='sum', observed=False
+    ).rename_axis(ROTULOS_CRITERIOS[campo])
+    tabela.columns = [f"{medida} - {status}" for medida, status in tabela.columns]
+    st.dataframe(tabela)
+
+
+aba_ativa = st.radio("Seção", ABAS, horizontal=True, label_visibility="collapsed", key="aba_ativa")
+
+with instrumentacao.etapa(f"seção {aba_ativa}"):
+    if aba_ativa == ABAS[0]:
+        aba_dados_empresas(df_filtered, estado_filtros)
+    elif aba_ativa == ABAS[1]:
+        aba_analises_visuais(df_filtered, estado_filtros, modo_grafico, top_n_grafico)
+    elif aba_ativa == ABAS[2]:
+        if portfolio_dataset is None:
+            # Cubo de benchmark calculado uma vez por portfólio; as médias seguem os filtros da barra lateral
+            with instrumentacao.etapa("cubo setorial"):
+                cubo_setorial = cache_portfolios.obter_derivado(chave_portfolio, 'cubo_setorial', lambda: CuboSetorial(df))
+            with instrumentacao.etapa("médias por setor"):
+                medias_setores = cubo_setorial.medias_filtradas(df_filtered, filtros_categorias, filtros_faixas)
+            escopo_cubo = "portfólio completo"
+        else:
+            # Dataset fora da memória: médias em streaming sobre todas as linhas filtradas e
+            # distribuições (mediana, percentis) sobre a fatia carregada
+            if st.session_state.get('cubo_dataset', (None,))[0] != estado_filtros:
+                with instrumentacao.etapa("cubo setorial"):
+                    st.session_state['cubo_dataset'] = (estado_filtros, CuboSetorial(df_filtered))
+            cubo_setorial = st.session_state['cubo_dataset'][1]
+            with instrumentacao.etapa("médias por setor em streaming"):
+                medias_setores = portfolio_dataset.medias_setor(filtros_categorias, filtros_faixas)
+            escopo_cubo = "visão filtrada"
+        aba_benchmarking(df_filtered, estado_filtros, cubo_setorial, medias_setores, escopo_cubo, modo_grafico, top_n_grafico)
+    elif aba_ativa == ABAS[3]:
+        aba_bonds(df_filtered, estado_filtros, modo_grafico, top_n_grafico)
+    elif aba_ativa == ABAS[4]:
+        aba_sobre_indicadores()
+    elif aba_ativa == ABAS[7]:
+        aba_simulacao_limites(df_filtered, estado_filtros)
+    else:
+        # Índice de nomes e CNPJs por portfólio; a visão restringe busca e linhas aos filtros atuais
+        with instrumentacao.etapa("índice de empresas"):
+            if portfolio_dataset is None:
+                indice_empresas = cache_portfolios.obter_derivado(
+                    chave_portfolio, 'indice_empresas', lambda: IndiceEmpresas(df)
+                )
+            else:
+                # Dataset fora da memória: índice da fatia carregada
+                if st.session_state.get('indice_empresas_dataset', (None,))[0] != estado_filtros:
+                    st.session_state['indice_empresas_dataset'] = (estado_filtros, IndiceEmpresas(df_filtered))
+                indice_empresas = st.session_state['indice_empresas_dataset'][1]
+            if st.session_state.get('visao_empresas', (None,))[0] != estado_filtros:
+                st.session_state['visao_empresas'] = (estado_filtros, indice_empresas.visao(df_filtered))
+        visao_empresas = st.session_state['visao_empresas'][1]
+        if aba_ativa == ABAS[5]:
+            aba_analises_detalhadas(df_filtered, estado_filtros, visao_empresas)
+        else:
+            aba_analise_comparativa(df_filtered, estado_filtros, visao_empresas)
+
+# Painel de diagnóstico com as etapas medidas nesta execução
+if instrumentacao.ativa:
+    with st.sidebar.expander("⏱️ Diagnóstico de Desempenho"):
+        st.caption(
+            f"Execução {instrumentacao.execucao}: {instrumentacao.segundos_execucao() * 1000:,.0f} ms no total. "
+            f"Etapas acrescentadas a {instrumentacao.caminho_log}."
+        )
+        estatisticas_cache = cache_portfolios.estatisticas()
+        st.caption(
+            f"Cache compartilhado: {estatisticas_cache['itens']} portfólios, "
+            f"{estatisticas_cache['bytes'] / 1024 ** 2:,.1f} de {estatisticas_cache['max_bytes'] / 1024 ** 2:,.0f} MB; "
+            f"{estatisticas_cache['acertos']} acertos, {estatisticas_cache['falhas']} falhas, "
+            f"{estatisticas_cache['remocoes']} remoções."
+        )
+        instrumentacao.registrar('cache_portfolios', estatisticas_cache)
+        etapas_medidas = pd.DataFrame(instrumentacao.resumo(), columns=['Etapa', 'Tempo (ms)', 'Pico de memória (MB)', 'Linhas'])
+        st.dataframe(etapas_medidas.astype({'Linhas': 'Int64'}), hide_index=True, use_container_width=True)
+
 # Melhorias na Interface do Usuário
 st.markdown("""
 <style>
@@ -529,7 +737,7 @@ st.markdown("""
         padding: 8px 16px;
         margin-top: 10px;
     }
-    .stTabs [data-baseweb="tab"] {
+    .st-key-aba_ativa label p {
         font-size: 18px;
     }
     .css-1d391kg {
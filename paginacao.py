@@ -0,0 +1,35 @@
+import math
+
+import pandas as pd
+
+TAMANHOS_PAGINA = [25, 50, 100, 250, 500]
+
+
+def total_paginas(n_linhas, tamanho_pagina):
+    return max(1, math.ceil(n_linhas / tamanho_pagina))
+
+
+class TabelaPaginada:
+    """Ordena o DataFrame filtrado no servidor e devolve apenas a página visível.
+
+    A ordem calculada fica em cache para o último estado de filtros/ordenação,
+    então trocar de página não reordena a tabela.
+    """
+
+    def __init__(self):
+        self._ultima = None
+
+    def ordem(self, df, estado, coluna, ascendente):
+        chave = (estado, coluna, ascendente)
+        if self._ultima is not None and self._ultima[0] == chave:
+            return self._ultima[1]
+        # Series com RangeIndex: o índice ordenado são as posições das linhas em df
+        valores = pd.Series(df[coluna].array)
+        posicoes = valores.sort_values(ascending=ascendente, kind='stable', na_position='last').index.to_numpy()
+        self._ultima = (chave, posicoes)
+        return posicoes
+
+    def pagina(self, df, estado, coluna, ascendente, numero, tamanho_pagina):
+        posicoes = self.ordem(df, estado, coluna, ascendente)
+        inicio = (numero - 1) * tamanho_pagina
+        return df.iloc[posicoes[inicio:inicio + tamanho_pagina]]
@@ -0,0 +1,98 @@
+"""Pontuação em lote de portfólios, sem o Streamlit.
+
+Lê arquivos CSV, XLSX ou Parquet, aplica validação, colunas derivadas, conformidade
+e riscos (processamento.py) e grava um Parquet pontuado por arquivo de entrada.
+Os Parquets gerados podem ser carregados no dashboard sem novo processamento.
+Com --particionar, as saídas formam um único dataset particionado (hive) para
+consulta fora da memória (dataset_particionado.py).
+
+Uso:
+    python pipeline.py carteiras/ extra.csv --saida pontuados/ --workers 8
+    python pipeline.py historico/ --saida dataset/ --particionar Setor
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from dataset_particionado import gravar_particionado
+from ingestao import gravar_parquet_pontuado, ler_portfolio
+
+EXTENSOES_ENTRADA = ('.csv', '.xlsx', '.parquet')
+
+
+def listar_entradas(caminhos):
+    # Expande diretórios (recursivamente) nos arquivos com extensão suportada
+    arquivos = []
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            for raiz, _, nomes in os.walk(caminho):
+                arquivos += [os.path.join(raiz, n) for n in sorted(nomes) if n.endswith(EXTENSOES_ENTRADA)]
+        else:
+            arquivos.append(caminho)
+    return arquivos
+
+
+def caminho_saida(entrada, diretorio_saida):
+    nome = os.path.splitext(os.path.basename(entrada))[0]
+    return os.path.join(diretorio_saida, f"{nome}.parquet")
+
+
+def pontuar_arquivo(entrada, diretorio_saida, particoes=None):
+    inicio = time.perf_counter()
+    df = ler_portfolio(entrada, os.path.basename(entrada))
+    if particoes:
+        nome = os.path.splitext(os.path.basename(entrada))[0]
+        saida = gravar_particionado(df, diretorio_saida, particoes, nome)
+    else:
+        saida = caminho_saida(entrada, diretorio_saida)
+        gravar_parquet_pontuado(df, saida)
+    return saida, len(df), time.perf_counter() - inicio
+
+
+def pontuar_arquivos(entradas, diretorio_saida, max_workers=None, log=print, particoes=None):
+    """Pontua cada arquivo em um processo do pool; retorna {entrada: erro} dos que falharam."""
+    saidas = [caminho_saida(e, diretorio_saida) for e in entradas]
+    repetidas = sorted({s for s in saidas if saidas.count(s) > 1})
+    if repetidas:
+        raise ValueError(f"Arquivos de entrada gerariam a mesma saída: {', '.join(repetidas)}")
+    os.makedirs(diretorio_saida, exist_ok=True)
+
+    falhas = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        tarefas = {executor.submit(pontuar_arquivo, e, diretorio_saida, particoes): e for e in entradas}
+        for tarefa in as_completed(tarefas):
+            entrada = tarefas[tarefa]
+            try:
+                saida, linhas, duracao = tarefa.result()
+                log(f"OK    {entrada} -> {saida} ({linhas:,} linhas, {duracao:.1f} s)")
+            except Exception as e:
+                falhas[entrada] = e
+                log(f"ERRO  {entrada}: {e}")
+    return falhas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pontua portfólios ESG em lote e grava Parquets pontuados.")
+    parser.add_argument('entradas', nargs='+', help="Arquivos CSV/XLSX/Parquet ou diretórios com eles")
+    parser.add_argument('-o', '--saida', required=True, help="Diretório dos Parquets pontuados")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Processos em paralelo (padrão: número de núcleos)")
+    parser.add_argument('--particionar', nargs='+', metavar='COLUNA', default=None,
+                        help="Grava um dataset particionado por estas colunas (ex.: Setor)")
+    args = parser.parse_args(argv)
+
+    entradas = listar_entradas(args.entradas)
+    if not entradas:
+        parser.error("nenhum arquivo CSV, XLSX ou Parquet encontrado nas entradas")
+    try:
+        falhas = pontuar_arquivos(entradas, args.saida, args.workers, particoes=args.particionar)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{len(entradas) - len(falhas)} de {len(entradas)} arquivos pontuados.")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
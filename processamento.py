@@ -0,0 +1,96 @@
+from dataclasses import dataclass
+
+import pandas as pd
+
+from risco import pontuar_riscos
+
+# Colunas obrigatórias do portfólio
+required_columns = [
+    'CNPJ', 'Empresa', 'Setor', 'Valor_emprestimo', 'Fator_emissao',
+    'Empregos_Criados', 'ESG_Score', 'E_Score', 'S_Score', 'G_Score',
+    'Credit_Rating', 'YTM', 'Duration', 'Total_Bonds_Issued',
+    'Energia_Renovavel_Pcnt', 'Emissoes_CO2', 'Reducao_Residuos_Ton',
+    'Economia_Agua_M3', 'Meta_Carbono_Neutro', 'Certificacoes_Ambientais',
+    'Empregos_Vulneraveis', 'Beneficiarios_Projetos', 'Investimento_Social_K',
+    'Diversidade_Genero_Pcnt', 'Projetos_Comunidade',
+    'Transparencia_Score', 'Politicas_ESG',
+    'Comite_Sustentabilidade', 'Reportes_GRI'
+]
+
+# Critérios de conformidade para Green e Social Bonds
+@dataclass(frozen=True)
+class CriteriosConformidade:
+    energia_renovavel_min: float = 40
+    emissoes_co2_max: float = 500000
+    certificacoes_min: float = 2
+    empregos_criados_min: float = 40
+    empregos_vulneraveis_min: float = 10
+    investimento_social_min: float = 400
+
+
+CRITERIOS_PADRAO = CriteriosConformidade()
+
+# Ordem das categorias de Status_Conformidade (código 0 a 3)
+STATUS_CONFORMIDADE = [
+    'Totalmente Conforme',
+    'Conforme Green Bond',
+    'Conforme Social Bond',
+    'Não Conforme'
+]
+
+
+class ColunasFaltandoError(ValueError):
+    def __init__(self, colunas):
+        self.colunas = list(colunas)
+        super().__init__(f"Faltando colunas no DataFrame: {', '.join(self.colunas)}")
+
+    def __reduce__(self):
+        # Preserva a lista de colunas ao atravessar processos (pipeline.py)
+        return (type(self), (self.colunas,))
+
+
+def validar_colunas(colunas):
+    missing_columns = [col for col in required_columns if col not in colunas]
+    if missing_columns:
+        raise ColunasFaltandoError(missing_columns)
+
+
+def mascara_green_bond(df, criterios=CRITERIOS_PADRAO):
+    return (
+        (df['Energia_Renovavel_Pcnt'].to_numpy() >= criterios.energia_renovavel_min) &
+        (df['Emissoes_CO2'].to_numpy() <= criterios.emissoes_co2_max) &
+        (df['Certificacoes_Ambientais'].to_numpy() >= criterios.certificacoes_min)
+    )
+
+
+def mascara_social_bond(df, criterios=CRITERIOS_PADRAO):
+    return (
+        (df['Empregos_Criados'].to_numpy() >= criterios.empregos_criados_min) &
+        (df['Empregos_Vulneraveis'].to_numpy() >= criterios.empregos_vulneraveis_min) &
+        (df['Investimento_Social_K'].to_numpy() >= criterios.investimento_social_min)
+    )
+
+
+def avaliar_conformidade(df, criterios=CRITERIOS_PADRAO):
+    # Classificação colunar: o código do status é 3 - 2*green - social (ver STATUS_CONFORMIDADE)
+    green = mascara_green_bond(df, criterios)
+    social = mascara_social_bond(df, criterios)
+    codigos = 3 - 2 * green.astype('int8') - social.astype('int8')
+    status = pd.Categorical.from_codes(codigos, categories=STATUS_CONFORMIDADE)
+    return pd.Series(status, index=df.index, name='Status_Conformidade')
+
+
+def enriquecer(df):
+    df['Emissoes_CO2'] = df['Valor_emprestimo'] * df['Fator_emissao']  # Em kgCO2
+    df['Intensidade_carbono'] = df['Emissoes_CO2'] / df['Valor_emprestimo']
+    df['Impacto_Social_Score'] = (df['Empregos_Criados'] + df['Beneficiarios_Projetos']/100) / 2
+    return df
+
+
+# Validação, colunas derivadas, conformidade e riscos em um único passo
+def processar_portfolio(df, criterios=CRITERIOS_PADRAO):
+    validar_colunas(df.columns)
+    df = enriquecer(df)
+    df['Status_Conformidade'] = avaliar_conformidade(df, criterios)
+    df = pontuar_riscos(df)
+    return df
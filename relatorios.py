@@ -0,0 +1,147 @@
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+# Colunas usadas no relatório por empresa (e no resumo consolidado do lote)
+COLUNAS_RELATORIO = [
+    'Empresa', 'CNPJ', 'Setor', 'Valor_emprestimo', 'Status_Conformidade',
+    'Emissoes_CO2', 'Energia_Renovavel_Pcnt', 'Reducao_Residuos_Ton', 'Economia_Agua_M3',
+    'Meta_Carbono_Neutro', 'Certificacoes_Ambientais', 'Empregos_Criados',
+    'Empregos_Vulneraveis', 'Beneficiarios_Projetos', 'Investimento_Social_K',
+    'Diversidade_Genero_Pcnt', 'Projetos_Comunidade', 'ESG_Score', 'E_Score',
+    'S_Score', 'G_Score', 'Transparencia_Score', 'Politicas_ESG',
+    'Comite_Sustentabilidade', 'Reportes_GRI'
+]
+# Empresas por tarefa enviada aos workers
+RELATORIOS_POR_LOTE = 500
+# Abaixo deste número de empresas os relatórios são gerados no próprio processo
+MIN_EMPRESAS_PARALELO = 2000
+
+FORMATOS_RESUMO = ['Nenhum', 'CSV', 'Parquet']
+
+
+def _valores_python(empresa_data):
+    # Escalares numpy viram int/float/bool do Python: inteiros compactados (ex.: int16, ver
+    # compactar_tipos) não podem transbordar nas contas abaixo, como já ocorre no lote (to_dict)
+    return {
+        coluna: valor.item() if hasattr(valor, 'item') else valor
+        for coluna, valor in dict(empresa_data).items()
+    }
+
+
+# Função para gerar relatório da empresa
+def gerar_relatorio_empresa(empresa_data):
+    empresa_data = _valores_python(empresa_data)
+    report = f"""Relatório de Análise ESG - {empresa_data['Empresa']}
+1. INFORMAÇÕES GERAIS
+---------------------
+CNPJ: {empresa_data['CNPJ']}
+Setor: {empresa_data['Setor']}
+Valor do Empréstimo: R$ {empresa_data['Valor_emprestimo']:,.2f}
+Status de Conformidade: {empresa_data['Status_Conformidade']}
+
+2. INDICADORES AMBIENTAIS
+-------------------------
+Emissões CO2: {empresa_data['Emissoes_CO2']:,.2f} kg
+Energia Renovável: {empresa_data['Energia_Renovavel_Pcnt']}%
+Redução de Resíduos: {empresa_data['Reducao_Residuos_Ton']} ton
+Economia de Água: {empresa_data['Economia_Agua_M3']} m³
+Meta Carbono Neutro: {empresa_data['Meta_Carbono_Neutro']}
+Certificações: {empresa_data['Certificacoes_Ambientais']}
+
+3. INDICADORES SOCIAIS
+----------------------
+Empregos Criados: {empresa_data['Empregos_Criados']}
+Empregos Vulneráveis: {empresa_data['Empregos_Vulneraveis']}
+Beneficiários: {empresa_data['Beneficiarios_Projetos']}
+Investimento Social: R$ {empresa_data['Investimento_Social_K']*1000:,.2f}
+Diversidade de Gênero: {empresa_data['Diversidade_Genero_Pcnt']}%
+Projetos na Comunidade: {empresa_data['Projetos_Comunidade']}
+
+4. PONTUAÇÕES ESG
+-----------------
+ESG Score Total: {empresa_data['ESG_Score']}
+Score Ambiental: {empresa_data['E_Score']}
+Score Social: {empresa_data['S_Score']}
+Score Governança: {empresa_data['G_Score']}
+
+5. GOVERNANÇA
+-------------
+Transparência: {empresa_data['Transparencia_Score']}
+Políticas ESG: {'Sim' if empresa_data['Politicas_ESG'] else 'Não'}
+Comitê de Sustentabilidade: {'Sim' if empresa_data['Comite_Sustentabilidade'] else 'Não'}
+Relatórios GRI: {'Sim' if empresa_data['Reportes_GRI'] else 'Não'}
+"""
+    return report
+
+
+
+def nome_relatorio(empresa):
+    return f"relatorio_{str(empresa).replace(' ', '_')}.txt"
+
+
+def _renderizar_lote(registros):
+    # Executado nos workers: recebe dicionários simples para evitar serializar DataFrames
+    return [gerar_relatorio_empresa(registro) for registro in registros]
+
+
+def _lotes(registros, tamanho):
+    for inicio in range(0, len(registros), tamanho):
+        yield registros[inicio:inicio + tamanho]
+
+
+def _executor(paralelismo, max_workers):
+    if paralelismo == 'threads':
+        return ThreadPoolExecutor(max_workers=max_workers)
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
+def gerar_zip_relatorios(df, destino=None, formato_resumo='Nenhum', paralelismo='processos',
+                         max_workers=None, progresso=None):
+    """Gera um relatório TXT por linha de `df` e grava todos em um ZIP.
+
+    Os lotes são renderizados em paralelo e escritos no ZIP à medida que ficam prontos,
+    na ordem do DataFrame. `progresso(feitos, total)` é chamado após cada lote.
+    Retorna `destino` (um BytesIO novo quando não informado).
+    """
+    destino = destino if destino is not None else io.BytesIO()
+    registros = df[COLUNAS_RELATORIO].to_dict('records')
+    total = len(registros)
+    lotes = _lotes(registros, RELATORIOS_POR_LOTE)
+    nomes_usados = {}
+
+    with zipfile.ZipFile(destino, mode='w', compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+        if total < MIN_EMPRESAS_PARALELO:
+            resultados = map(_renderizar_lote, lotes)
+            executor = None
+        else:
+            executor = _executor(paralelismo, max_workers or os.cpu_count())
+            resultados = executor.map(_renderizar_lote, lotes)
+        try:
+            feitos = 0
+            for lote, textos in zip(_lotes(registros, RELATORIOS_POR_LOTE), resultados):
+                for registro, texto in zip(lote, textos):
+                    nome = nome_relatorio(registro['Empresa']).replace('/', '_')
+                    # Empresas com o mesmo nome recebem sufixo numérico
+                    repeticoes = nomes_usados.get(nome, 0)
+                    nomes_usados[nome] = repeticoes + 1
+                    if repeticoes:
+                        nome = f"{nome[:-4]}_{repeticoes + 1}.txt"
+                    arquivo_zip.writestr(nome, texto)
+                feitos += len(lote)
+                if progresso is not None:
+                    progresso(feitos, total)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        if formato_resumo == 'CSV':
+            arquivo_zip.writestr('resumo_relatorios.csv', df[COLUNAS_RELATORIO].to_csv(index=False))
+        elif formato_resumo == 'Parquet':
+            buffer = io.BytesIO()
+            df[COLUNAS_RELATORIO].to_parquet(buffer, index=False)
+            arquivo_zip.writestr('resumo_relatorios.parquet', buffer.getvalue())
+
+    return destino
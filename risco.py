@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+# Faixas do risco ESG total: < 30 Baixo, < 60 Médio, demais Alto
+LIMITES_RISCO_ESG = [30, 60]
+NIVEIS_RISCO_ESG = ['Baixo', 'Médio', 'Alto']
+
+NIVEIS_RISCO_CREDITO = ['Baixo Risco', 'Médio Risco', 'Alto Risco']
+
+# Escala completa de ratings (S&P/Fitch e Moody's, em maiúsculas; Aaa coincide com AAA).
+# Grau de investimento é Baixo Risco e grau especulativo é Alto Risco;
+# ratings fora da tabela (ex.: NR, vazio) ficam como Médio Risco.
+_GRAU_INVESTIMENTO = [
+    'AAA', 'AA+', 'AA', 'AA-', 'A+', 'A', 'A-', 'BBB+', 'BBB', 'BBB-',
+    'AA1', 'AA2', 'AA3', 'A1', 'A2', 'A3', 'BAA1', 'BAA2', 'BAA3',
+]
+_GRAU_ESPECULATIVO = [
+    'BB+', 'BB', 'BB-', 'B+', 'B', 'B-', 'CCC+', 'CCC', 'CCC-', 'CC', 'C',
+    'RD', 'SD', 'D',
+    'BA1', 'BA2', 'BA3', 'B1', 'B2', 'B3', 'CAA1', 'CAA2', 'CAA3', 'CA',
+]
+RISCO_POR_RATING = {
+    **{rating: 'Baixo Risco' for rating in _GRAU_INVESTIMENTO},
+    **{rating: 'Alto Risco' for rating in _GRAU_ESPECULATIVO},
+}
+
+
+def calcular_risco_esg_total(df):
+    e_score = df['E_Score'].to_numpy(dtype='float64')
+    s_score = df['S_Score'].to_numpy(dtype='float64')
+    g_score = df['G_Score'].to_numpy(dtype='float64')
+    emissoes = df['Emissoes_CO2'].to_numpy(dtype='float64')
+    criados = df['Empregos_Criados'].to_numpy(dtype='float64')
+    vulneraveis = df['Empregos_Vulneraveis'].to_numpy(dtype='float64')
+    comite = df['Comite_Sustentabilidade'].astype(bool).to_numpy()
+
+    risco_ambiental = (100 - e_score) * (emissoes / 1000000)
+    # Empresas sem empregos criados não têm proporção de vulneráveis (tratada como 0)
+    proporcao_vulneraveis = np.divide(
+        vulneraveis, criados, out=np.zeros_like(vulneraveis), where=criados != 0
+    )
+    risco_social = (100 - s_score) * (1 - proporcao_vulneraveis)
+    risco_governanca = (100 - g_score) * np.where(comite, 0.5, 1.0)
+    risco_total = (risco_ambiental + risco_social + risco_governanca) / 3
+    return pd.Series(risco_total, index=df.index, name='Risco_ESG_Total')
+
+
+def classificar_risco_esg(risco_total):
+    # np.digitize coloca NaN na última faixa, como a comparação linha a linha fazia
+    codigos = np.digitize(np.asarray(risco_total, dtype='float64'), LIMITES_RISCO_ESG)
+    niveis = pd.Categorical.from_codes(codigos, categories=NIVEIS_RISCO_ESG)
+    index = risco_total.index if isinstance(risco_total, pd.Series) else None
+    return pd.Series(niveis, index=index, name='Risco_ESG')
+
+
+def normalizar_rating(rating):
+    if not isinstance(rating, str):
+        return None
+    return rating.strip().upper()
+
+
+def calcular_risco(df):
+    # O lookup é feito só sobre os ratings distintos e depois expandido pelos códigos
+    codigos, ratings = pd.factorize(df['Credit_Rating'])
+    niveis = [
+        NIVEIS_RISCO_CREDITO.index(RISCO_POR_RATING.get(normalizar_rating(r), 'Médio Risco'))
+        for r in ratings
+    ]
+    niveis.append(NIVEIS_RISCO_CREDITO.index('Médio Risco'))  # código -1 (rating ausente)
+    risk_level = pd.Categorical.from_codes(
+        np.asarray(niveis, dtype='int8')[codigos], categories=NIVEIS_RISCO_CREDITO
+    )
+    return pd.Series(risk_level, index=df.index, name='Risk_Level')
+
+
+def pontuar_riscos(df):
+    df['Risco_ESG_Total'] = calcular_risco_esg_total(df)
+    df['Risco_ESG'] = classificar_risco_esg(df['Risco_ESG_Total'])
+    df['Risk_Level'] = calcular_risco(df)
+    return df
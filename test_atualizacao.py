@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from atualizacao import TotaisPortfolio, aplicar_delta
+from benchmark_setor import DIMENSOES_CUBO, CuboSetorial
+from dados_sinteticos import gerar_portfolio
+from ingestao import compactar_tipos
+from processamento import processar_portfolio
+
+
+def pontuar(bruto):
+    return compactar_tipos(processar_portfolio(bruto.copy()))
+
+
+def upsert_referencia(bruto, delta):
+    # Reconstrução completa: a última linha de cada CNPJ do delta substitui a do portfólio ou vai para o fim
+    delta = delta.drop_duplicates('CNPJ', keep='last')
+    resultado = bruto.set_index('CNPJ')
+    existentes = delta[delta['CNPJ'].isin(resultado.index)].set_index('CNPJ')
+    resultado.loc[existentes.index] = existentes[resultado.columns]
+    novas = delta[~delta['CNPJ'].isin(resultado.index)].set_index('CNPJ')
+    return pd.concat([resultado, novas[resultado.columns]]).reset_index()[bruto.columns]
+
+
+@pytest.fixture
+def cenario():
+    bruto = gerar_portfolio(400, semente=11).reset_index(drop=True)
+    bruto[['E_Score', 'Emissoes_CO2']] = bruto[['E_Score', 'Emissoes_CO2']].astype('float64')
+    bruto.loc[[5, 17], 'E_Score'] = np.nan
+    menor_esg, maior_ytm = 7, 9
+    bruto.loc[menor_esg, 'ESG_Score'] = 10  # mínimo único de ESG_Score
+    bruto.loc[maior_ytm, 'YTM'] = 19.9  # máximo único de YTM
+
+    alteradas = bruto.iloc[[3, 50, menor_esg, maior_ytm, 17]].copy()
+    alteradas['ESG_Score'] += 5
+    alteradas.loc[alteradas.index == menor_esg, 'ESG_Score'] = 99  # a linha do mínimo deixa de sê-lo
+    alteradas.loc[alteradas.index == maior_ytm, 'YTM'] = 1.0  # a linha do máximo deixa de sê-lo
+    alteradas.loc[alteradas.index == 17, 'E_Score'] = 60.0  # o único NaN restante continua em 5
+    repetida = bruto.iloc[[3]].copy()
+    repetida['Valor_emprestimo'] = 123456.0  # mesmo CNPJ duas vezes no delta: vale a última
+
+    novas = gerar_portfolio(6, semente=12).reset_index(drop=True)
+    novas['CNPJ'] = [f"99.999.999/0001-{i:02d}" for i in range(6)]
+    novas['E_Score'] = novas['E_Score'].astype('float64')
+    novas.loc[:1, 'Setor'] = 'Setor Novo'
+    novas.loc[2:3, 'Credit_Rating'] = 'BB+X'
+    novas.loc[4, 'E_Score'] = np.nan
+
+    delta = pd.concat([alteradas, repetida, novas], ignore_index=True)
+    return bruto, delta
+
+
+def test_upsert_igual_a_reconstrucao(cenario):
+    bruto, delta = cenario
+    resultado = aplicar_delta(pontuar(bruto), delta)
+    esperado = pontuar(upsert_referencia(bruto, delta))
+    pd.testing.assert_frame_equal(
+        resultado.df.astype({'Setor': object, 'Credit_Rating': object}),
+        esperado.astype({'Setor': object, 'Credit_Rating': object}),
+        check_dtype=False,
+    )
+    assert (resultado.atualizadas, resultado.inseridas) == (5, 6)
+    assert resultado.df.loc[resultado.df['CNPJ'] == bruto.loc[3, 'CNPJ'], 'Valor_emprestimo'].tolist() == [123456.0]
+    assert isinstance(resultado.df['Setor'].dtype, pd.CategoricalDtype)
+    assert 'Setor Novo' in resultado.df['Setor'].cat.categories
+
+
+def test_totais_ajustados_iguais_a_reconstrucao(cenario):
+    bruto, delta = cenario
+    base = pontuar(bruto)
+    resultado = aplicar_delta(base, delta)
+    ajustados = TotaisPortfolio(base).atualizado(resultado.removidas, resultado.adicionadas).kpis()
+    esperados = TotaisPortfolio(resultado.df).kpis()
+    assert ajustados.keys() == esperados.keys()
+    for chave, valor in esperados.items():
+        assert ajustados[chave] == pytest.approx(valor, rel=1e-12), chave
+
+
+def _comparar_cubos(ajustado, esperado):
+    for dimensoes in DIMENSOES_CUBO:
+        pd.testing.assert_frame_equal(
+            ajustado.estatisticas(*dimensoes), esperado.estatisticas(*dimensoes),
+            check_dtype=False, check_categorical=False, check_index_type=False,
+        )
+    assert ajustado.setores == esperado.setores
+    for coluna, (menor, maior) in esperado._extremos.items():
+        np.testing.assert_equal(ajustado._extremos[coluna], (menor, maior), err_msg=coluna)
+
+
+def test_cubo_ajustado_igual_a_reconstrucao(cenario):
+    bruto, delta = cenario
+    base = pontuar(bruto)
+    resultado = aplicar_delta(base, delta)
+    ajustado = CuboSetorial(base).atualizado(resultado.df, resultado.removidas, resultado.adicionadas)
+    esperado = CuboSetorial(resultado.df)
+    _comparar_cubos(ajustado, esperado)
+    # Extremos que mudaram: o mínimo de ESG e o máximo de YTM saíram do portfólio
+    assert esperado._extremos['ESG_Score'][0] > base['ESG_Score'].min()
+    assert esperado._extremos['YTM'][1] < base['YTM'].max()
+
+    setores = ['Setor Novo', 'Tecnologia', 'Varejo']
+    categorias = {
+        'Setor': setores,
+        'Status_Conformidade': list(resultado.df['Status_Conformidade'].cat.categories),
+        'Credit_Rating': ['BB+X', 'A', 'BBB'],
+    }
+    faixas = {'ESG_Score': (0, 100), 'YTM': (0, 100)}
+    filtrado = resultado.df[
+        resultado.df['Setor'].isin(setores) & resultado.df['Credit_Rating'].isin(categorias['Credit_Rating'])
+    ]
+    pd.testing.assert_frame_equal(
+        ajustado.medias_filtradas(filtrado, categorias, faixas),
+        esperado.medias_filtradas(filtrado, categorias, faixas),
+        check_dtype=False, check_categorical=False, check_index_type=False,
+    )
+
+
+def test_deltas_em_sequencia(cenario):
+    bruto, delta = cenario
+    base = pontuar(bruto)
+    cubo, totais = CuboSetorial(base), TotaisPortfolio(base)
+    for parte in (delta.iloc[:4], delta.iloc[4:]):
+        resultado = aplicar_delta(base, parte)
+        cubo = cubo.atualizado(resultado.df, resultado.removidas, resultado.adicionadas)
+        totais = totais.atualizado(resultado.removidas, resultado.adicionadas)
+        base = resultado.df
+    _comparar_cubos(cubo, CuboSetorial(base))
+    for chave, valor in TotaisPortfolio(base).kpis().items():
+        assert totais.kpis()[chave] == pytest.approx(valor, rel=1e-12), chave
@@ -0,0 +1,45 @@
+from cache_lru import CacheLRU
+from cenarios import CacheCenarios
+from dados_sinteticos import gerar_portfolio
+from exportacao import CacheExportacoes
+from processamento import processar_portfolio
+
+
+def test_descarta_os_usados_ha_mais_tempo_pelo_tamanho():
+    cache = CacheLRU(max_bytes=10, tamanho=len)
+    cache.obter('a', lambda: 'xxxx')
+    cache.obter('b', lambda: 'xxxx')
+    assert cache.consultar('a') == 'xxxx'  # 'a' passa a ser o mais recente
+    cache.obter('c', lambda: 'xxxx')
+    assert cache.consultar('b') is None
+    assert (len(cache), cache.total_bytes) == (2, 8)
+
+
+def test_item_maior_que_o_limite_fica_sozinho():
+    cache = CacheLRU(max_bytes=10, tamanho=len)
+    cache.obter('a', lambda: 'xx')
+    assert cache.obter('b', lambda: 'x' * 50) == 'x' * 50
+    assert (len(cache), cache.total_bytes) == (1, 50)
+
+
+def test_guardar_de_novo_nao_conta_o_tamanho_duas_vezes():
+    cache = CacheLRU(max_bytes=100, tamanho=len)
+    cache.guardar('a', 'xxxx')
+    cache.guardar('a', 'xx')
+    assert cache.total_bytes == 2
+
+
+def test_caches_da_sessao_respeitam_o_limite_em_bytes():
+    df = processar_portfolio(gerar_portfolio(300))
+    exportacoes = CacheExportacoes(max_bytes=1)
+    for estado in ['a', 'b']:
+        exportacoes.gerar(df, estado, 'CSV')
+    assert exportacoes.obter('a', 'CSV') is None
+    assert exportacoes.obter('b', 'CSV') is not None
+
+    cenarios = CacheCenarios(max_bytes=1)
+    grade = {'energia_renovavel_min': [30, 40]}
+    primeiro = cenarios.obter(df, 'a', grade)
+    assert cenarios.obter(df, 'a', grade) is primeiro
+    cenarios.obter(df, 'b', grade)
+    assert cenarios.obter(df, 'a', grade) is not primeiro
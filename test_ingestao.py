@@ -0,0 +1,81 @@
+import io
+import os
+import time
+
+import pytest
+
+from dados_sinteticos import gerar_portfolio
+from ingestao import CachePortfolios, PartesInvalidasError, converter_partes, limitar_conversoes
+
+
+def csv_enviado(df, nome):
+    arquivo = io.BytesIO()
+    df.to_csv(arquivo, index=False)
+    arquivo.seek(0)
+    arquivo.name = nome
+    return arquivo
+
+
+def pastas(diretorio):
+    return sorted(os.listdir(diretorio))
+
+
+def test_envio_com_arquivo_invalido_nao_deixa_conversoes_orfas(tmp_path):
+    valido = csv_enviado(gerar_portfolio(50, semente=1), 'valido.csv')
+    invalido = csv_enviado(gerar_portfolio(50, semente=2).drop(columns=['ESG_Score']), 'invalido.csv')
+
+    with pytest.raises(PartesInvalidasError) as erro:
+        converter_partes([(valido, 'valido.csv'), (invalido, 'invalido.csv')], str(tmp_path))
+    assert list(erro.value.erros) == ['invalido.csv']
+
+    # Só a conversão do arquivo válido fica, completa e com manifesto; nenhum temporário sobra
+    restantes = pastas(tmp_path)
+    assert len(restantes) == 1
+    arquivos = os.listdir(tmp_path / restantes[0])
+    assert 'partes.json' in arquivos
+    assert not [a for a in arquivos if a.endswith(('.tmp', '.csv'))]
+
+    # O arquivo válido é reaproveitado em um novo envio
+    partes = converter_partes([(valido, 'valido.csv')], str(tmp_path))
+    assert [os.path.dirname(caminho) for _, caminho in partes] == [str(tmp_path / restantes[0])]
+
+
+def test_pastas_sem_manifesto_antigas_sao_removidas(tmp_path):
+    converter_partes([(csv_enviado(gerar_portfolio(50), 'a.csv'), 'a.csv')], str(tmp_path))
+    concluida = pastas(tmp_path)[0]
+    orfa, em_andamento = tmp_path / 'orfa', tmp_path / 'em_andamento'
+    for pasta in (orfa, em_andamento):
+        pasta.mkdir()
+        (pasta / 'parte_0_0.parquet').write_bytes(b'x' * 1000)
+    antiga = time.time() - 2 * 3600
+    os.utime(orfa, (antiga, antiga))
+
+    limitar_conversoes(str(tmp_path), max_bytes=10 ** 9)
+    assert pastas(tmp_path) == sorted([concluida, 'em_andamento'])
+
+
+def test_limite_remove_conversoes_usadas_ha_mais_tempo(tmp_path):
+    envios = [csv_enviado(gerar_portfolio(50, semente), 'a.csv') for semente in range(3)]
+    for envio in envios:
+        converter_partes([(envio, 'a.csv')], str(tmp_path))
+    # Usos em ordem: 0, 1, 2; depois o primeiro envio é reaproveitado e passa a ser o mais recente
+    for i, pasta in enumerate(pastas(tmp_path)):
+        os.utime(tmp_path / pasta / 'partes.json', (1000 + i, 1000 + i))
+    partes = converter_partes([(envios[0], 'a.csv')], str(tmp_path))
+    reaproveitada = os.path.basename(os.path.dirname(partes[0][1]))
+
+    tamanho = sum(f.stat().st_size for f in (tmp_path / reaproveitada).iterdir())
+    limitar_conversoes(str(tmp_path), max_bytes=int(tamanho * 1.5))
+    assert pastas(tmp_path) == [reaproveitada]
+
+
+def test_cache_em_disco_grava_por_inteiro_e_respeita_o_limite(tmp_path):
+    df = gerar_portfolio(200)
+    cache = CachePortfolios(diretorio=str(tmp_path), max_bytes_disco=1)
+    for chave in ['v1-a', 'v1-b']:
+        cache.obter(chave, lambda: df)
+    # Só o último portfólio gravado fica no disco, sem temporários
+    assert pastas(tmp_path) == ['v1-b.parquet']
+
+    outro = CachePortfolios(diretorio=str(tmp_path))
+    assert len(outro.obter('v1-b', lambda: pytest.fail("deveria ler do disco"))) == 200
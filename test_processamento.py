@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dados_sinteticos import gerar_portfolio
+from processamento import (
+    CRITERIOS_PADRAO, STATUS_CONFORMIDADE, CriteriosConformidade, avaliar_conformidade
+)
+
+
+def classificar_linha(row, criterios=CRITERIOS_PADRAO):
+    # Implementação de referência, linha a linha, da classificação original
+    green = (
+        row['Energia_Renovavel_Pcnt'] >= criterios.energia_renovavel_min and
+        row['Emissoes_CO2'] <= criterios.emissoes_co2_max and
+        row['Certificacoes_Ambientais'] >= criterios.certificacoes_min
+    )
+    social = (
+        row['Empregos_Criados'] >= criterios.empregos_criados_min and
+        row['Empregos_Vulneraveis'] >= criterios.empregos_vulneraveis_min and
+        row['Investimento_Social_K'] >= criterios.investimento_social_min
+    )
+    if green and social:
+        return 'Totalmente Conforme'
+    elif green:
+        return 'Conforme Green Bond'
+    elif social:
+        return 'Conforme Social Bond'
+    return 'Não Conforme'
+
+
+def referencia(df, criterios=CRITERIOS_PADRAO):
+    return df.apply(classificar_linha, axis=1, criterios=criterios)
+
+
+def linha_base(**valores):
+    # Uma empresa que atende exatamente a todos os limites padrão
+    linha = {
+        'Energia_Renovavel_Pcnt': 40.0, 'Emissoes_CO2': 500000.0, 'Certificacoes_Ambientais': 2,
+        'Empregos_Criados': 40, 'Empregos_Vulneraveis': 10, 'Investimento_Social_K': 400.0,
+    }
+    linha.update(valores)
+    return linha
+
+
+def assert_paridade(df, criterios=CRITERIOS_PADRAO):
+    resultado = avaliar_conformidade(df, criterios)
+    esperado = referencia(df, criterios)
+    assert resultado.tolist() == esperado.tolist()
+    assert resultado.index.equals(df.index)
+    return resultado
+
+
+def test_limites_exatos_sao_conformes():
+    resultado = assert_paridade(pd.DataFrame([linha_base()]))
+    assert resultado.iloc[0] == 'Totalmente Conforme'
+
+
+@pytest.mark.parametrize('coluna, abaixo, esperado', [
+    ('Energia_Renovavel_Pcnt', 39.99, 'Conforme Social Bond'),
+    ('Emissoes_CO2', 500000.01, 'Conforme Social Bond'),
+    ('Certificacoes_Ambientais', 1, 'Conforme Social Bond'),
+    ('Empregos_Criados', 39, 'Conforme Green Bond'),
+    ('Empregos_Vulneraveis', 9, 'Conforme Green Bond'),
+    ('Investimento_Social_K', 399.99, 'Conforme Green Bond'),
+])
+def test_cada_limite_ultrapassado(coluna, abaixo, esperado):
+    resultado = assert_paridade(pd.DataFrame([linha_base(**{coluna: abaixo})]))
+    assert resultado.iloc[0] == esperado
+
+
+def test_nenhum_criterio_atendido():
+    df = pd.DataFrame([linha_base(Energia_Renovavel_Pcnt=0.0, Empregos_Criados=0)])
+    assert assert_paridade(df).iloc[0] == 'Não Conforme'
+
+
+@pytest.mark.parametrize('coluna', [
+    'Energia_Renovavel_Pcnt', 'Emissoes_CO2', 'Certificacoes_Ambientais',
+    'Empregos_Criados', 'Empregos_Vulneraveis', 'Investimento_Social_K',
+])
+def test_valor_ausente_nao_atende_o_criterio(coluna):
+    # Comparações com NaN são falsas, como na versão linha a linha
+    df = pd.DataFrame([linha_base(), linha_base(**{coluna: np.nan})])
+    resultado = assert_paridade(df)
+    assert resultado.iloc[0] == 'Totalmente Conforme'
+    assert resultado.iloc[1] != 'Totalmente Conforme'
+
+
+def test_codigos_das_categorias():
+    df = pd.DataFrame([
+        linha_base(),
+        linha_base(Empregos_Criados=0),
+        linha_base(Energia_Renovavel_Pcnt=0.0),
+        linha_base(Energia_Renovavel_Pcnt=0.0, Empregos_Criados=0),
+    ])
+    resultado = assert_paridade(df)
+    assert isinstance(resultado.dtype, pd.CategoricalDtype)
+    assert list(resultado.cat.categories) == STATUS_CONFORMIDADE
+    assert resultado.cat.codes.tolist() == [0, 1, 2, 3]
+    assert resultado.name == 'Status_Conformidade'
+
+
+def test_indice_preservado():
+    df = pd.DataFrame([linha_base(), linha_base(Empregos_Criados=0)], index=[10, 3])
+    assert assert_paridade(df).index.tolist() == [10, 3]
+
+
+def test_portfolio_vazio():
+    df = pd.DataFrame([linha_base()]).iloc[:0]
+    resultado = avaliar_conformidade(df)
+    assert len(resultado) == 0
+    assert list(resultado.cat.categories) == STATUS_CONFORMIDADE
+
+
+@pytest.mark.parametrize('criterios', [
+    CRITERIOS_PADRAO,
+    CriteriosConformidade(energia_renovavel_min=60, emissoes_co2_max=200000, certificacoes_min=4),
+    CriteriosConformidade(empregos_criados_min=70, empregos_vulneraveis_min=25, investimento_social_min=600),
+])
+def test_paridade_portfolio_sintetico(criterios):
+    df = gerar_portfolio(2000, semente=5)
+    df['Emissoes_CO2'] = df['Valor_emprestimo'] * df['Fator_emissao']
+    df.loc[df.sample(frac=0.05, random_state=1).index, 'Energia_Renovavel_Pcnt'] = np.nan
+    df.loc[df.sample(frac=0.05, random_state=2).index, 'Investimento_Social_K'] = np.nan
+    resultado = assert_paridade(df, criterios)
+    assert resultado.nunique() > 1
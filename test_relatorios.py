@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from dados_sinteticos import gerar_portfolio
+from ingestao import compactar_tipos
+from processamento import processar_portfolio
+from relatorios import COLUNAS_RELATORIO, gerar_relatorio_empresa
+
+# Primeiras empresas do portfólio de exemplo do main.py
+EXEMPLO = {
+    'CNPJ': ['12.345.678/0001-90', '98.765.432/0001-10', '11.111.111/0001-99'],
+    'Empresa': ['TechNova', 'EcoEnergia', 'Construtora Silva'],
+    'Setor': ['Tecnologia', 'Energia Renovável', 'Construção'],
+    'Valor_emprestimo': [1000000, 500000, 300000],
+    'Emissoes_CO2': [820000, 10000, 150000],
+    'Energia_Renovavel_Pcnt': [30, 95, 45],
+    'Reducao_Residuos_Ton': [150, 80, 45],
+    'Economia_Agua_M3': [5000, 3000, 2000],
+    'Meta_Carbono_Neutro': [2030, 2025, 2035],
+    'Certificacoes_Ambientais': [3, 5, 2],
+    'Empregos_Criados': [50, 100, 30],
+    'Empregos_Vulneraveis': [15, 30, 8],
+    'Beneficiarios_Projetos': [1000, 2000, 500],
+    'Investimento_Social_K': [500, 800, 300],
+    'Diversidade_Genero_Pcnt': [45, 55, 35],
+    'Projetos_Comunidade': [5, 8, 3],
+    'ESG_Score': [75, 85, 65],
+    'E_Score': [70, 90, 60],
+    'S_Score': [80, 80, 70],
+    'G_Score': [75, 85, 65],
+    'Transparencia_Score': [85, 90, 75],
+    'Politicas_ESG': [True, True, False],
+    'Comite_Sustentabilidade': [True, True, False],
+    'Reportes_GRI': [True, True, False],
+    'Credit_Rating': ['A', 'BBB', 'AA'],
+    'YTM': [5.0, 4.5, 6.0],
+    'Duration': [5, 7, 3],
+    'Total_Bonds_Issued': [500000, 750000, 300000],
+    'Fator_emissao': [0.82, 0.02, 0.5],
+}
+
+
+@pytest.mark.parametrize('dados', [
+    pd.DataFrame(EXEMPLO),
+    gerar_portfolio(200, semente=4),
+], ids=['exemplo', 'sintetico'])
+def test_relatorio_igual_antes_e_depois_da_compactacao(dados):
+    original = processar_portfolio(dados.copy())
+    compactado = compactar_tipos(processar_portfolio(dados.copy()))
+    registros = compactado[COLUNAS_RELATORIO].to_dict('records')
+    for i in range(len(original)):
+        esperado = gerar_relatorio_empresa(original.iloc[i])
+        # Relatório de uma empresa (linha do DataFrame) e do lote (dicionário) iguais ao original
+        assert gerar_relatorio_empresa(compactado.iloc[i]) == esperado
+        assert gerar_relatorio_empresa(registros[i]) == esperado
+
+
+def test_investimento_social_em_reais():
+    compactado = compactar_tipos(processar_portfolio(pd.DataFrame(EXEMPLO)))
+    assert 'Investimento Social: R$ 500,000.00' in gerar_relatorio_empresa(compactado.iloc[0])
+    assert 'Investimento Social: R$ 800,000.00' in gerar_relatorio_empresa(compactado.iloc[1])